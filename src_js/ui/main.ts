@@ -5,18 +5,31 @@ import * as juggler from '@hat-open/juggler';
 import type * as api from '../api';
 
 
+type ViewFile = {
+    type: 'TEXT' | 'JSON' | 'BINARY';
+    url: string;
+};
+
 type InitMsg = {
     user: string | null;
     roles: string[];
-    view: Record<string, u.JData> | null;
+    view: Record<string, ViewFile> | null;
+    view_digest: string | null;
     conf: u.JData;
 };
 
+type View = Record<string, u.JData>;
+
+
+const maxViewCacheSize = 5;
+
 
 const defaultStyleElements = new Set<HTMLStyleElement>();
 let app: juggler.Application;
 let env: api.Env | null = null;
 let logoutAction: api.LogoutAction | null = null;
+const viewCache = new Map<string, View>();
+let viewDigestsSent = false;
 
 
 async function main() {
@@ -92,6 +105,8 @@ async function onNotify(notification: juggler.Notification) {
 
 
 async function onDisconnected() {
+    viewDigestsSent = false;
+
     if (!env || !env.onDisconnected)
         return;
 
@@ -117,10 +132,37 @@ async function initView(msg: InitMsg) {
             el.parentNode?.removeChild(el);
     });
 
-    if (msg.view == null)
+    // view digests are associated with connection - first init
+    // notification received on each connection precedes login
+    if (!viewDigestsSent && viewCache.size)
+        sendViewDigests();
+
+    if (msg.view_digest == null)
         return;
 
-    const src = u.get('index.js', msg.view);
+    let view = viewCache.get(msg.view_digest);
+    if (!view) {
+        if (msg.view == null) {
+            // server assumed cached view which is no longer available
+            disconnect();
+            return;
+        }
+
+        try {
+            view = await getView(msg.view);
+        } catch (e) {
+            console.error(e);
+            return;
+        }
+
+        viewCache.set(msg.view_digest, view);
+        while (viewCache.size > maxViewCacheSize)
+            viewCache.delete(viewCache.keys().next().value as string);
+
+        sendViewDigests();
+    }
+
+    const src = u.get('index.js', view);
     if (!u.isString(src))
         return;
 
@@ -128,7 +170,7 @@ async function initView(msg: InitMsg) {
         conf: msg.conf,
         user: msg.user,
         roles: msg.roles,
-        view: msg.view,
+        view: view,
         login: login,
         logout: logout,
         send: send,
@@ -152,6 +194,44 @@ async function initView(msg: InitMsg) {
 }
 
 
+function sendViewDigests() {
+    viewDigestsSent = true;
+    app.send('view_digests', Array.from(viewCache.keys())).catch(
+        e => console.error(e));
+}
+
+
+async function getView(files: Record<string, ViewFile>): Promise<View> {
+    const entries = await Promise.all(Object.entries(files).map(
+        async ([name, file]) => {
+            const res = await fetch(file.url);
+            if (!res.ok)
+                throw new Error(`error fetching view file ${name}`);
+
+            let data: u.JData;
+            if (file.type == 'TEXT') {
+                data = await res.text();
+            } else if (file.type == 'JSON') {
+                data = await res.json();
+            } else {
+                data = encodeBase64(new Uint8Array(await res.arrayBuffer()));
+            }
+            return [name, data] as [string, u.JData];
+        }
+    ));
+    return Object.fromEntries(entries);
+}
+
+
+function encodeBase64(data: Uint8Array): string {
+    const chunkSize = 0x8000;
+    const chunks: string[] = [];
+    for (let i = 0; i < data.length; i += chunkSize)
+        chunks.push(String.fromCharCode(...data.subarray(i, i + chunkSize)));
+    return btoa(chunks.join(''));
+}
+
+
 async function login(name: string, password: string) {
     await app.send('login', {name, password});
 }
@@ -2,14 +2,43 @@
 
 This adapter provides latest event for each configured event type.
 
+Item's event type can contain ``?`` and ``*`` wildcards. Each concrete event
+type matching such item is available with key derived from item's key and
+event subtypes matched by wildcards (joined with ``/``).
+
+Access to each item can be additionally restricted with item's
+`authorized_roles`. Sessions with same set of accessible items share single
+state which is updated incrementally.
+
+If item defines `min_interval`, changes of item's data are published at most
+once during this interval. Changes received during this interval are
+coalesced and last received data is published once interval expires.
+
+Events are converted to JSON data only once they are published. Data
+of recently converted events is cached and shared between keys.
+
+If `client_subscriptions` is enabled, session state is initially empty and
+contains only keys subscribed with session's `subscribe` requests.
+
+If `delta_resync` is enabled, adapter's state is kept after adapter is
+closed (e.g. because connection to event server is lost). Adapter created
+afterwards with same configuration, in same process, reuses this state and
+queries only events with timestamp not older than last received event. This
+requires event server to store timeseries of all configured event types.
+
+If received events are dropped (because of adapter's dispatch queue
+overflow), latest events are queried again and applied to current state.
+
 """
 
-import base64
+import asyncio
 import collections
 import functools
+import typing
 
 from hat import aio
 from hat import json
+from hat import util
 import hat.event.common
 
 from hat.gui import common
@@ -23,22 +52,83 @@ def create_subscription(conf):
 async def create_adapter(conf, eventer_client):
     adapter = LatestAdapter()
     adapter._authorized_roles = set(conf['authorized_roles'])
+    adapter._client_subscriptions = conf.get('client_subscriptions', False)
+    adapter._eventer_client = eventer_client
+    adapter._loop = asyncio.get_running_loop()
     adapter._async_group = aio.Group()
 
-    adapter._event_type_keys = collections.defaultdict(collections.deque)
-    for item in conf['items']:
-        event_type = tuple(item['event_type'])
-        adapter._event_type_keys[event_type].append(item['key'])
+    try:
+        items = [_Item(key=item['key'],
+                       query_type=tuple(item['event_type']),
+                       roles=(frozenset(item['authorized_roles'])
+                              if 'authorized_roles' in item else None),
+                       min_interval=item.get('min_interval'))
+                 for item in conf['items']]
+
+        adapter._items = hat.event.common.create_event_type_collection(
+            (hat.event.common.create_subscription([item.query_type]), item)
+            for item in items)
+        adapter._item_roles = {item.roles for item in items
+                               if item.roles is not None}
+        adapter._restricting_roles = frozenset().union(*adapter._item_roles)
+        adapter._event_type_keys = {}
+        adapter._key_roles = {}
+        adapter._key_intervals = {}
+
+        adapter._partitions = {}
+        adapter._changes_cbs = util.CallbackRegistry()
+        adapter._key_event_ids = {}
+        adapter._event_data_cache = collections.OrderedDict()
+        adapter._publish_times = {}
+        adapter._pending = {}
+        adapter._pending_dues = {}
+        adapter._pending_timer = None
+        adapter._async_group.spawn(aio.call_on_cancel, adapter._cancel_pending)
+
+        adapter._last_timestamp = None
+
+        adapter._resync_key = (json.encode(conf) if conf.get('delta_resync')
+                               else None)
+        resync_state = _resync_states.pop(adapter._resync_key, None)
+
+        adapter._async_group.spawn(aio.call_on_cancel,
+                                   adapter._save_resync_state)
+
+        subscription = create_subscription(conf)
+        event_types = list(subscription.get_query_types())
+        adapter._event_types = event_types
+
+        if resync_state:
+            adapter._state = json.Storage(resync_state.data)
+            adapter._key_event_ids = resync_state.key_event_ids
+            adapter._event_type_keys = resync_state.event_type_keys
+            adapter._key_roles = resync_state.key_roles
+            adapter._key_intervals = resync_state.key_intervals
+            adapter._last_timestamp = resync_state.timestamp
+
+            last_event_id = None
+            while True:
+                params = hat.event.common.QueryTimeseriesParams(
+                    event_types=event_types,
+                    t_from=resync_state.timestamp,
+                    order=hat.event.common.Order.ASCENDING,
+                    order_by=hat.event.common.OrderBy.TIMESTAMP,
+                    last_event_id=last_event_id)
+                result = await eventer_client.query(params)
+                adapter._apply_events(result.events)
+
+                if not result.more_follows or not result.events:
+                    break
+
+                last_event_id = result.events[-1].id
 
-    if adapter._event_type_keys:
-        event_types = list(adapter._event_type_keys.keys())
-        params = hat.event.common.QueryLatestParams(event_types)
-        result = await eventer_client.query(params)
-
-    else:
-        result = hat.event.common.QueryResult([], False)
+        else:
+            adapter._state = json.Storage({})
+            await adapter.resync()
 
-    adapter._state = json.Storage(dict(adapter._events_to_data(result.events)))
+    except BaseException:
+        await aio.uncancellable(adapter.async_close())
+        raise
 
     return adapter
 
@@ -56,33 +146,266 @@ class LatestAdapter(common.Adapter):
         return self._async_group
 
     async def process_events(self, events):
-        data = dict(self._events_to_data(events))
-        if not data:
+        self._apply_events(events)
+
+    async def resync(self):
+        if not self._event_types:
             return
 
-        self._state.set([], {**self._state.data, **data})
+        params = hat.event.common.QueryLatestParams(self._event_types)
+        result = await self._eventer_client.query(params)
+        self._apply_events(result.events)
 
     async def create_session(self, user, roles, state, notify_cb):
         session = LatestSession()
         session._async_group = self.async_group.create_subgroup()
+        session._adapter = self
+        session._state = state
+        session._keys = set()
+        session._prefixes = set()
+        session._subscriptions_enabled = False
 
         is_authorized = not roles.isdisjoint(self._authorized_roles)
 
-        if is_authorized:
+        if all(not roles.isdisjoint(i) for i in self._item_roles):
+            partition_roles = None
+
+        else:
+            partition_roles = frozenset(roles & self._restricting_roles)
+
+        session._roles = partition_roles
+
+        if is_authorized and self._client_subscriptions:
+            session._subscriptions_enabled = True
+
+            handle = self._changes_cbs.register(session._on_changes)
+            session.async_group.spawn(aio.call_on_cancel, handle.cancel)
+            state.set([], {})
+
+        elif is_authorized:
+            partition_state = self._acquire_partition(partition_roles)
+            session.async_group.spawn(aio.call_on_cancel,
+                                      self._release_partition,
+                                      partition_roles)
+
             change_cb = functools.partial(state.set, [])
-            handle = self._state.register_change_cb(change_cb)
+            handle = partition_state.register_change_cb(change_cb)
             session.async_group.spawn(aio.call_on_cancel, handle.cancel)
-            change_cb(self._state.data)
+            change_cb(partition_state.data)
 
         else:
             state.set([], {})
 
         return session
 
-    def _events_to_data(self, events):
-        for event in events:
-            for key in self._event_type_keys.get(event.type, []):
-                yield key, _event_to_data(event)
+    def _acquire_partition(self, roles):
+        if roles is None:
+            return self._state
+
+        partition = self._partitions.get(roles)
+        if not partition:
+            partition = _Partition(
+                state=json.Storage({key: value
+                                    for key, value in self._state.data.items()
+                                    if self._is_key_visible(key, roles)}),
+                sessions_count=0)
+
+        self._partitions[roles] = partition._replace(
+            sessions_count=partition.sessions_count + 1)
+        return partition.state
+
+    def _release_partition(self, roles):
+        partition = self._partitions.get(roles)
+        if not partition:
+            return
+
+        if partition.sessions_count > 1:
+            self._partitions[roles] = partition._replace(
+                sessions_count=partition.sessions_count - 1)
+
+        else:
+            del self._partitions[roles]
+
+    def _is_key_visible(self, key, roles):
+        if roles is None:
+            return True
+
+        key_roles = self._key_roles.get(key)
+        return key_roles is None or not key_roles.isdisjoint(roles)
+
+    def _get_keys(self, event_type):
+        keys = self._event_type_keys.get(event_type)
+        if keys is not None:
+            return keys
+
+        keys = collections.deque()
+        for item in self._items.get(event_type):
+            key = _get_item_key(item, event_type)
+            keys.append(key)
+
+            if item.roles is not None:
+                self._key_roles[key] = (
+                    self._key_roles.get(key, frozenset()) | item.roles)
+
+            if item.min_interval is not None:
+                self._key_intervals[key] = item.min_interval
+
+        self._event_type_keys[event_type] = keys
+        return keys
+
+    def _apply_events(self, events):
+        latest_events = {event.type: event for event in events}
+
+        for event in latest_events.values():
+            if (self._last_timestamp is None or
+                    self._last_timestamp < event.timestamp):
+                self._last_timestamp = event.timestamp
+
+        now = self._loop.time()
+        changes = {}
+        for event_type, event in latest_events.items():
+            for key in self._get_keys(event_type):
+                if key in self._pending:
+                    self._pending[key] = event
+                    continue
+
+                if self._key_event_ids.get(key) == event.id:
+                    continue
+
+                interval = self._key_intervals.get(key)
+                if interval is not None:
+                    publish_time = self._publish_times.get(key)
+                    if (publish_time is not None and
+                            publish_time + interval > now):
+                        self._pending[key] = event
+                        self._pending_dues[key] = publish_time + interval
+                        continue
+
+                if self._set_key_event(key, event, changes):
+                    if interval is not None:
+                        self._publish_times[key] = now
+
+        self._publish(changes)
+        self._schedule_pending()
+
+    def _on_pending_timer(self):
+        self._pending_timer = None
+        now = self._loop.time()
+
+        changes = {}
+        for key, due in list(self._pending_dues.items()):
+            if due > now:
+                continue
+
+            event = self._pending.pop(key)
+            del self._pending_dues[key]
+
+            if self._set_key_event(key, event, changes):
+                self._publish_times[key] = now
+
+        self._publish(changes)
+        self._schedule_pending()
+
+    def _set_key_event(self, key, event, changes):
+        self._key_event_ids[key] = event.id
+
+        event_data = self._get_event_data(event)
+        if self._state.data.get(key) == event_data:
+            return False
+
+        changes[key] = event_data
+        return True
+
+    def _get_event_data(self, event):
+        event_data = self._event_data_cache.get(event.id)
+        if event_data is not None:
+            self._event_data_cache.move_to_end(event.id)
+            return event_data
+
+        event_data = _event_to_data(event)
+
+        self._event_data_cache[event.id] = event_data
+        while len(self._event_data_cache) > _event_data_cache_size:
+            self._event_data_cache.popitem(last=False)
+
+        return event_data
+
+    def _schedule_pending(self):
+        if not self._pending_dues:
+            return
+
+        due = min(self._pending_dues.values())
+        if self._pending_timer:
+            if self._pending_timer.when() <= due:
+                return
+
+            self._pending_timer.cancel()
+
+        self._pending_timer = self._loop.call_at(due, self._on_pending_timer)
+
+    def _save_resync_state(self):
+        if self._resync_key is None or self._last_timestamp is None:
+            return
+
+        timestamp = min([self._last_timestamp,
+                         *(event.timestamp
+                           for event in self._pending.values())])
+
+        _resync_states[self._resync_key] = _ResyncState(
+            data=self._state.data,
+            key_event_ids=self._key_event_ids,
+            event_type_keys=self._event_type_keys,
+            key_roles=self._key_roles,
+            key_intervals=self._key_intervals,
+            timestamp=timestamp)
+
+    def _cancel_pending(self):
+        if self._pending_timer:
+            self._pending_timer.cancel()
+            self._pending_timer = None
+
+    def _publish(self, changes):
+        if not changes:
+            return
+
+        self._state.set([], {**self._state.data, **changes})
+
+        for roles, partition in self._partitions.items():
+            partition_changes = {key: value for key, value in changes.items()
+                                 if self._is_key_visible(key, roles)}
+            if not partition_changes:
+                continue
+
+            partition.state.set([], {**partition.state.data,
+                                     **partition_changes})
+
+        self._changes_cbs.notify(changes)
+
+
+_event_data_cache_size = 1024
+
+_resync_states = {}
+
+
+class _Item(typing.NamedTuple):
+    key: str
+    query_type: hat.event.common.EventType
+    roles: frozenset[str] | None
+    min_interval: float | None
+
+
+class _ResyncState(typing.NamedTuple):
+    data: json.Data
+    key_event_ids: dict[str, hat.event.common.EventId]
+    event_type_keys: dict[hat.event.common.EventType, collections.deque]
+    key_roles: dict[str, frozenset[str]]
+    key_intervals: dict[str, float]
+    timestamp: hat.event.common.Timestamp
+
+
+class _Partition(typing.NamedTuple):
+    state: json.Storage
+    sessions_count: int
 
 
 class LatestSession(common.AdapterSession):
@@ -92,7 +415,67 @@ class LatestSession(common.AdapterSession):
         return self._async_group
 
     async def process_request(self, name, data):
-        raise Exception('not supported')
+        if not self._subscriptions_enabled:
+            raise Exception('not supported')
+
+        if name == 'subscribe':
+            keys = set(data.get('keys', []))
+            prefixes = set(data.get('prefixes', []))
+
+            self._keys.update(keys)
+            self._prefixes.update(prefixes)
+
+            if prefixes:
+                new_keys = self._adapter._state.data.keys()
+
+            else:
+                new_keys = keys
+
+            state_data = {**self._state.data,
+                          **self._get_data(self._adapter._state.data,
+                                           new_keys)}
+
+        elif name == 'unsubscribe':
+            self._keys.difference_update(data.get('keys', []))
+            self._prefixes.difference_update(data.get('prefixes', []))
+
+            state_data = self._get_data(self._state.data,
+                                        self._state.data.keys())
+
+        else:
+            raise Exception('unsupported request')
+
+        if state_data != self._state.data:
+            self._state.set([], state_data)
+
+    def _on_changes(self, changes):
+        data = self._get_data(changes, changes.keys())
+        if not data:
+            return
+
+        self._state.set([], {**self._state.data, **data})
+
+    def _get_data(self, data, keys):
+        return {key: data[key]
+                for key in keys
+                if key in data and
+                self._is_key_subscribed(key) and
+                self._adapter._is_key_visible(key, self._roles)}
+
+    def _is_key_subscribed(self, key):
+        return (key in self._keys or
+                any(key.startswith(prefix) for prefix in self._prefixes))
+
+
+def _get_item_key(item, event_type):
+    subtypes = [subtype
+                for subtype, query_subtype in zip(event_type, item.query_type)
+                if query_subtype == '?']
+
+    if item.query_type and item.query_type[-1] == '*':
+        subtypes.extend(event_type[len(item.query_type) - 1:])
+
+    return '/'.join([item.key, *subtypes])
 
 
 def _event_to_data(event):
@@ -103,20 +486,4 @@ def _event_to_data(event):
 
     return {'timestamp': timestamp,
             'source_timestamp': source_timestamp,
-            'payload': _event_payload_to_json(event.payload)}
-
-
-def _event_payload_to_json(payload):
-    if payload is None:
-        return
-
-    if isinstance(payload, hat.event.common.EventPayloadJson):
-        return {'type': 'JSON',
-                'data': payload.data}
-
-    if isinstance(payload, hat.event.common.EventPayloadBinary):
-        return {'type': 'BINARY',
-                'name': payload.type,
-                'data': base64.b64encode(payload.data).decode()}
-
-    raise ValueError('unsupported payload type')
+            'payload': common.event_payload_to_json(event.payload)}
@@ -0,0 +1,223 @@
+"""Query adapter
+
+This adapter provides timeseries queries of events with configured event
+types.
+
+Results are returned in pages containing at most `max_results` events.
+If more events are available, result contains `cursor` which can be
+used for querying next page.
+
+Query results are cached (shared between all sessions) and invalidated once
+adapter receives new event that could be part of cached result. Concurrent
+identical queries are executed as single eventer query. If received
+events are dropped (because of adapter's dispatch queue overflow), all
+cached results are invalidated.
+
+"""
+
+import asyncio
+import collections
+import logging
+import typing
+
+from hat import aio
+import hat.event.common
+
+from hat.gui import common
+
+
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+
+def create_subscription(conf):
+    return hat.event.common.create_subscription(tuple(i)
+                                                for i in conf['event_types'])
+
+
+async def create_adapter(conf, eventer_client):
+    adapter = QueryAdapter()
+    adapter._authorized_roles = set(conf['authorized_roles'])
+    adapter._max_results = conf.get('max_results', 100)
+    adapter._cache_size = conf.get('cache_size', 100)
+    adapter._subscription = create_subscription(conf)
+    adapter._eventer_client = eventer_client
+    adapter._async_group = aio.Group()
+    adapter._cache = collections.OrderedDict()
+    adapter._queries = {}
+
+    return adapter
+
+
+info = common.AdapterInfo(create_subscription=create_subscription,
+                          create_adapter=create_adapter,
+                          json_schema_id='hat-gui://adapters/query.yaml',
+                          json_schema_repo=common.json_schema_repo)
+
+
+class QueryAdapter(common.Adapter):
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    async def process_events(self, events):
+        if not events:
+            return
+
+        event_types = {event.type for event in events}
+        timestamp = min(event.timestamp for event in events)
+
+        def is_affected(params, subscription):
+            if params.t_to is not None and params.t_to < timestamp:
+                return False
+
+            return any(subscription.matches(event_type)
+                       for event_type in event_types)
+
+        for params, entry in list(self._cache.items()):
+            if is_affected(params, entry.subscription):
+                del self._cache[params]
+
+        for params, query in list(self._queries.items()):
+            if is_affected(params, query.subscription):
+                del self._queries[params]
+
+    async def resync(self):
+        self._cache.clear()
+        self._queries.clear()
+
+    async def create_session(self, user, roles, state, notify_cb):
+        session = QuerySession()
+        session._async_group = self.async_group.create_subgroup()
+        session._adapter = self
+        session._is_authorized = not roles.isdisjoint(self._authorized_roles)
+
+        return session
+
+    async def _query(self, data):
+        subscription = self._subscription.intersection(
+            hat.event.common.create_subscription(
+                tuple(i) for i in data.get('event_types', [['*']])))
+        event_types = sorted(subscription.get_query_types())
+
+        max_results = min(data.get('max_results', self._max_results),
+                          self._max_results)
+
+        if not event_types:
+            return {'events': [],
+                    'cursor': None}
+
+        params = hat.event.common.QueryTimeseriesParams(
+            event_types=tuple(event_types),
+            t_from=_timestamp_from_json(data.get('t_from')),
+            t_to=_timestamp_from_json(data.get('t_to')),
+            source_t_from=_timestamp_from_json(data.get('source_t_from')),
+            source_t_to=_timestamp_from_json(data.get('source_t_to')),
+            order=hat.event.common.Order[data.get('order', 'DESCENDING')],
+            order_by=hat.event.common.OrderBy[data.get('order_by',
+                                                       'TIMESTAMP')],
+            max_results=max_results,
+            last_event_id=_event_id_from_cursor(data.get('cursor')))
+
+        entry = self._cache.get(params)
+        if entry:
+            self._cache.move_to_end(params)
+            return entry.result
+
+        query = self._queries.get(params)
+        if not query:
+            query = _Query(
+                subscription=subscription,
+                task=self.async_group.spawn(self._eventer_query, params,
+                                            subscription))
+            self._queries[params] = query
+
+        return await asyncio.shield(query.task)
+
+    async def _eventer_query(self, params, subscription):
+        try:
+            mlog.debug("querying events (%s)", params)
+            result = await self._eventer_client.query(params)
+
+            events = list(result.events)
+            result = {'events': [_event_to_json(event) for event in events],
+                      'cursor': (_event_id_to_cursor(events[-1].id)
+                                 if result.more_follows and events
+                                 else None)}
+
+            if self._is_current_query(params):
+                self._cache[params] = _CacheEntry(subscription=subscription,
+                                                  result=result)
+
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+            return result
+
+        finally:
+            if self._is_current_query(params):
+                del self._queries[params]
+
+    def _is_current_query(self, params):
+        query = self._queries.get(params)
+        return query is not None and query.task is asyncio.current_task()
+
+
+class QuerySession(common.AdapterSession):
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    async def process_request(self, name, data):
+        if not self._is_authorized:
+            raise Exception('not authorized')
+
+        if name != 'query':
+            raise Exception('unsupported request')
+
+        return await self._adapter._query(data)
+
+
+class _Query(typing.NamedTuple):
+    subscription: hat.event.common.Subscription
+    task: asyncio.Task
+
+
+class _CacheEntry(typing.NamedTuple):
+    subscription: hat.event.common.Subscription
+    result: dict
+
+
+def _timestamp_from_json(data):
+    if data is None:
+        return
+
+    return hat.event.common.timestamp_from_float(data)
+
+
+def _event_id_to_cursor(event_id):
+    return f'{event_id.server}.{event_id.session}.{event_id.instance}'
+
+
+def _event_id_from_cursor(cursor):
+    if cursor is None:
+        return
+
+    server, session, instance = (int(i) for i in cursor.split('.'))
+    return hat.event.common.EventId(server=server,
+                                    session=session,
+                                    instance=instance)
+
+
+def _event_to_json(event):
+    return {'id': {'server': event.id.server,
+                   'session': event.id.session,
+                   'instance': event.id.instance},
+            'type': list(event.type),
+            'timestamp': hat.event.common.timestamp_to_float(event.timestamp),
+            'source_timestamp': (
+                hat.event.common.timestamp_to_float(event.source_timestamp)
+                if event.source_timestamp is not None else None),
+            'payload': common.event_payload_to_json(event.payload)}
@@ -0,0 +1,297 @@
+"""Trend adapter
+
+This adapter keeps numeric values of configured event types in fixed size
+ring buffers and provides downsampled ranges of these values.
+
+Value is obtained from event's JSON payload data (optionally referenced by
+item's `value_path`). Events without numeric value, already buffered events
+and events with timestamp older than timestamp of previously buffered value
+are ignored. Item's event type can contain ``?`` and ``*`` wildcards -
+values of all matching event types are buffered in item's single buffer.
+
+Buffers are initially filled with latest events queried from event server
+(queries of all items are executed concurrently).
+
+Session state contains number of buffered values and timestamps of first
+and last buffered value for each item. Values are obtained with `get`
+request, which returns at most ``2 * width`` values - if range contains
+more values, it is divided into `width` equal time buckets and only minimum
+and maximum value of each bucket are returned.
+
+"""
+
+import array
+import asyncio
+import bisect
+import functools
+import logging
+
+from hat import aio
+from hat import json
+import hat.event.common
+
+from hat.gui import common
+
+
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+
+def create_subscription(conf):
+    return hat.event.common.create_subscription(tuple(i['event_type'])
+                                                for i in conf['items'])
+
+
+async def create_adapter(conf, eventer_client):
+    adapter = TrendAdapter()
+    adapter._authorized_roles = set(conf['authorized_roles'])
+    adapter._async_group = aio.Group()
+    adapter._buffers = {}
+    adapter._items = {item['key']: item for item in conf['items']}
+    adapter._item_keys = hat.event.common.create_event_type_collection(
+        (hat.event.common.create_subscription([tuple(item['event_type'])]),
+         item['key'])
+        for item in conf['items'])
+    adapter._event_type_keys = {}
+
+    items_events = await asyncio.gather(
+        *(_query_events(eventer_client, tuple(item['event_type']),
+                        item['size'])
+          for item in conf['items']))
+
+    for item, events in zip(conf['items'], items_events):
+        buffer = _RingBuffer(item['size'])
+        adapter._buffers[item['key']] = buffer
+
+        for event in reversed(events):
+            _append_event(buffer, item, event)
+
+    adapter._state = json.Storage({
+        key: buffer.get_info() for key, buffer in adapter._buffers.items()})
+
+    return adapter
+
+
+info = common.AdapterInfo(create_subscription=create_subscription,
+                          create_adapter=create_adapter,
+                          json_schema_id='hat-gui://adapters/trend.yaml',
+                          json_schema_repo=common.json_schema_repo)
+
+
+class TrendAdapter(common.Adapter):
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    async def process_events(self, events):
+        changed_keys = set()
+
+        for event in events:
+            for key in self._get_keys(event.type):
+                if _append_event(self._buffers[key], self._items[key], event):
+                    changed_keys.add(key)
+
+        if not changed_keys:
+            return
+
+        self._state.set([], {**self._state.data,
+                             **{key: self._buffers[key].get_info()
+                                for key in changed_keys}})
+
+    async def create_session(self, user, roles, state, notify_cb):
+        session = TrendSession()
+        session._async_group = self.async_group.create_subgroup()
+        session._buffers = self._buffers
+        session._is_authorized = not roles.isdisjoint(self._authorized_roles)
+
+        if session._is_authorized:
+            change_cb = functools.partial(state.set, [])
+            handle = self._state.register_change_cb(change_cb)
+            session.async_group.spawn(aio.call_on_cancel, handle.cancel)
+            change_cb(self._state.data)
+
+        else:
+            state.set([], {})
+
+        return session
+
+    def _get_keys(self, event_type):
+        keys = self._event_type_keys.get(event_type)
+        if keys is None:
+            keys = self._item_keys.get(event_type)
+            self._event_type_keys[event_type] = keys
+
+        return keys
+
+
+class TrendSession(common.AdapterSession):
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    async def process_request(self, name, data):
+        if not self._is_authorized:
+            raise Exception('not authorized')
+
+        if name != 'get':
+            raise Exception('unsupported request')
+
+        buffer = self._buffers.get(data['key'])
+        if buffer is None:
+            raise Exception('invalid key')
+
+        if data['width'] < 1:
+            raise Exception('invalid width')
+
+        timestamps, values = buffer.get_range(t_from=data.get('t_from'),
+                                              t_to=data.get('t_to'),
+                                              width=data['width'])
+
+        return {'timestamps': timestamps.tolist(),
+                'values': values.tolist()}
+
+
+class _RingBuffer:
+
+    def __init__(self, size):
+        self._size = size
+        self._timestamps = array.array('d', [0]) * size
+        self._values = array.array('d', [0]) * size
+        self._start = 0
+        self._count = 0
+        self._last_event_ids = set()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._timestamps[(self._start + index) % self._size]
+
+    @property
+    def last_timestamp(self):
+        return self[self._count - 1] if self._count else None
+
+    @property
+    def last_event_ids(self):
+        return self._last_event_ids
+
+    def append(self, timestamp, value, event_id):
+        if timestamp != self.last_timestamp:
+            self._last_event_ids = set()
+        self._last_event_ids.add(event_id)
+
+        index = (self._start + self._count) % self._size
+        self._timestamps[index] = timestamp
+        self._values[index] = value
+
+        if self._count < self._size:
+            self._count += 1
+
+        else:
+            self._start = (self._start + 1) % self._size
+
+    def get_info(self):
+        return {'count': self._count,
+                't_from': self[0] if self._count else None,
+                't_to': self.last_timestamp}
+
+    def get_range(self, t_from, t_to, width):
+        start = (bisect.bisect_left(self, t_from) if t_from is not None
+                 else 0)
+        stop = (bisect.bisect_right(self, t_to) if t_to is not None
+                else self._count)
+
+        if stop - start <= 2 * width:
+            return (self._get_slice(self._timestamps, start, stop),
+                    self._get_slice(self._values, start, stop))
+
+        timestamps = array.array('d')
+        values = array.array('d')
+
+        bucket_t_from = self[start]
+        bucket_dt = (self[stop - 1] - bucket_t_from) / width
+        bucket_start = start
+
+        for i in range(1, width + 1):
+            if i < width:
+                bucket_stop = bisect.bisect_left(
+                    self, bucket_t_from + i * bucket_dt, bucket_start, stop)
+
+            else:
+                bucket_stop = stop
+
+            if bucket_start >= bucket_stop:
+                continue
+
+            bucket_values = self._get_slice(self._values, bucket_start,
+                                            bucket_stop)
+            min_index = bucket_values.index(min(bucket_values))
+            max_index = bucket_values.index(max(bucket_values))
+
+            for index in sorted({min_index, max_index}):
+                timestamps.append(self[bucket_start + index])
+                values.append(bucket_values[index])
+
+            bucket_start = bucket_stop
+
+        return timestamps, values
+
+    def _get_slice(self, data, start, stop):
+        if start >= stop:
+            return array.array('d')
+
+        start, stop = self._start + start, self._start + stop
+        if start >= self._size:
+            start, stop = start - self._size, stop - self._size
+
+        if stop <= self._size:
+            return data[start:stop]
+
+        return data[start:] + data[:stop - self._size]
+
+
+def _append_event(buffer, item, event):
+    if not isinstance(event.payload, hat.event.common.EventPayloadJson):
+        return False
+
+    value = json.get(event.payload.data, item.get('value_path', []))
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+
+    timestamp = hat.event.common.timestamp_to_float(event.timestamp)
+    last_timestamp = buffer.last_timestamp
+    if last_timestamp is not None:
+        if timestamp < last_timestamp:
+            mlog.debug("ignoring out of order event %s", event.id)
+            return False
+
+        if timestamp == last_timestamp and event.id in buffer.last_event_ids:
+            mlog.debug("ignoring already buffered event %s", event.id)
+            return False
+
+    buffer.append(timestamp, value, event.id)
+    return True
+
+
+async def _query_events(eventer_client, event_type, max_results):
+    events = []
+    last_event_id = None
+
+    while len(events) < max_results:
+        params = hat.event.common.QueryTimeseriesParams(
+            event_types=[event_type],
+            order=hat.event.common.Order.DESCENDING,
+            order_by=hat.event.common.OrderBy.TIMESTAMP,
+            max_results=max_results - len(events),
+            last_event_id=last_event_id)
+        result = await eventer_client.query(params)
+        events.extend(result.events)
+
+        if not result.more_follows or not result.events:
+            break
+
+        last_event_id = result.events[-1].id
+
+    return events
@@ -2,6 +2,7 @@
 
 from collections.abc import Collection
 import abc
+import base64
 import importlib.resources
 import typing
 
@@ -69,6 +70,17 @@ class Adapter(aio.Resource):
 
         """
 
+    async def resync(self):
+        """Resynchronize state after received events were dropped
+
+        This method is called if events, which should have been processed
+        by adapter, are dropped because of adapter's dispatch queue overflow.
+        Default implementation does nothing.
+
+        This method can be coroutine or regular function.
+
+        """
+
 
 AdapterConf: typing.TypeAlias = json.Data
 """Adapter configuration"""
@@ -117,3 +129,27 @@ def import_adapter_info(py_module_str: str) -> AdapterInfo:
         raise Exception('invalid adapter implementation')
 
     return info
+
+
+def event_payload_to_json(payload: hat.event.common.EventPayload | None
+                          ) -> json.Data:
+    """Convert event payload to JSON data
+
+    JSON payload is represented as ``{'type': 'JSON', 'data': ...}`` and
+    binary payload as ``{'type': 'BINARY', 'name': ..., 'data': ...}``
+    where binary data is `base64` encoded.
+
+    """
+    if payload is None:
+        return
+
+    if isinstance(payload, hat.event.common.EventPayloadJson):
+        return {'type': 'JSON',
+                'data': payload.data}
+
+    if isinstance(payload, hat.event.common.EventPayloadBinary):
+        return {'type': 'BINARY',
+                'name': payload.type,
+                'data': base64.b64encode(payload.data).decode()}
+
+    raise ValueError('unsupported payload type')
@@ -1,9 +1,12 @@
 """GUI engine"""
 
 from collections.abc import Collection, Iterable
+import asyncio
 import collections
+import enum
 import itertools
 import logging
+import time
 import typing
 
 from hat import aio
@@ -11,12 +14,32 @@ from hat import json
 import hat.event.eventer
 
 from hat.gui import common
+import hat.gui.server.process
 
 
 mlog: logging.Logger = logging.getLogger(__name__)
 """Module logger"""
 
 
+class OverflowPolicy(enum.Enum):
+    BLOCK = 'BLOCK'
+    COALESCE = 'COALESCE'
+    DROP = 'DROP'
+
+
+class QueueInfo(typing.NamedTuple):
+    """Adapter dispatch queue info
+
+    `size` is number of queued event batches and `lag` is time (in seconds)
+    elapsed since oldest queued batch was received. `dropped` is number of
+    events dropped due to queue overflow.
+
+    """
+    size: int
+    lag: float
+    dropped: int
+
+
 class ConfAdapterInfo(typing.NamedTuple):
     conf: common.AdapterConf
     subscription: hat.event.common.Subscription
@@ -28,9 +51,15 @@ async def create_conf_adapter_info(adapter_conf: Iterable[json.Data]
     info = common.import_adapter_info(adapter_conf['module'])
     subscription = await aio.call(info.create_subscription, adapter_conf)
 
+    if adapter_conf.get('hosting', 'LOCAL') == 'PROCESS':
+        create_adapter = hat.gui.server.process.create_adapter
+
+    else:
+        create_adapter = info.create_adapter
+
     return ConfAdapterInfo(conf=adapter_conf,
                            subscription=subscription,
-                           create_adapter=info.create_adapter)
+                           create_adapter=create_adapter)
 
 
 def get_subscriptions(infos: Iterable[ConfAdapterInfo]
@@ -44,25 +73,78 @@ def get_subscriptions(infos: Iterable[ConfAdapterInfo]
 
 
 async def create_manager(infos: Iterable[ConfAdapterInfo],
-                         eventer_client: hat.event.eventer.Client
+                         eventer_client: hat.event.eventer.Client,
+                         parallelism: int | None = None,
+                         batch_delay: float | None = None,
+                         batch_size: int | None = None,
+                         urgent_event_types: Iterable[hat.event.common.EventType] = ()  # NOQA
                          ) -> 'AdapterManager':
+    """Create adapter manager
+
+    Adapters are created concurrently. If `parallelism` is set, at most
+    `parallelism` adapters are created at the same time.
+
+    If `batch_delay` is set, received events are gathered for at most
+    `batch_delay` seconds (or until `batch_size` events are gathered) before
+    they are dispatched to adapters. Events matching `urgent_event_types`
+    are dispatched immediately, together with all previously gathered
+    events.
+
+    """
     manager = AdapterManager()
     manager._async_group = aio.Group()
     manager._infos = {}
     manager._adapters = {}
+    manager._adapter_names = hat.event.common.create_event_type_collection()
+    manager._queues = {}
+    manager._batch_delay = batch_delay
+    manager._batch_size = batch_size
+    manager._urgent_subscription = hat.event.common.create_subscription(
+        urgent_event_types)
+    manager._batch = collections.deque()
+    manager._batch_task = None
+    manager._batch_lock = asyncio.Lock()
+
+    semaphore = asyncio.Semaphore(parallelism) if parallelism else None
+
+    async def create_adapter(info):
+        if semaphore:
+            async with semaphore:
+                return await _create_adapter(manager.async_group, info,
+                                             eventer_client)
+
+        return await _create_adapter(manager.async_group, info,
+                                     eventer_client)
 
     try:
+        infos = list(infos)
+        names = set()
         for info in infos:
             name = info.conf['name']
-            if name in manager._infos:
+            if name in names:
                 raise Exception(f'adapter name {name} not unique')
 
-            adapter = await aio.call(info.create_adapter, info.conf,
-                                     eventer_client)
-            await _bind_resource(manager.async_group, adapter)
+            names.add(name)
+
+        async with manager.async_group.create_subgroup(
+                log_exceptions=False) as subgroup:
+            adapters = await asyncio.gather(
+                *(subgroup.spawn(create_adapter, info) for info in infos))
+
+        for info, adapter in zip(infos, adapters):
+            name = info.conf['name']
 
             manager._infos[name] = info
             manager._adapters[name] = adapter
+            manager._adapter_names.add(info.subscription, name)
+
+            queue = _AdapterQueue(
+                size=info.conf.get('queue_size', 0),
+                overflow=OverflowPolicy(info.conf.get('queue_overflow',
+                                                      'BLOCK')))
+            manager._queues[name] = queue
+            manager.async_group.spawn(manager._adapter_loop, name, adapter,
+                                      queue)
 
     except BaseException:
         await aio.uncancellable(manager.async_close())
@@ -84,21 +166,170 @@ class AdapterManager(aio.Resource):
         """Adapters"""
         return self._adapters
 
+    @property
+    def queue_infos(self) -> dict[str, QueueInfo]:
+        """Adapter dispatch queue infos"""
+        return {name: queue.info for name, queue in self._queues.items()}
+
     async def process_events(self, events: Collection[hat.event.common.Event]):
         mlog.debug('received new events (count: %s)', len(events))
 
+        if self._batch_delay is None:
+            await self._dispatch_events(events)
+            return
+
+        self._batch.extend(events)
+
+        if ((self._batch_size and len(self._batch) >= self._batch_size) or
+                any(self._urgent_subscription.matches(event.type)
+                    for event in events)):
+            if self._batch_task:
+                self._batch_task.cancel()
+                self._batch_task = None
+
+            await self._flush_batch()
+
+        elif self._batch and not self._batch_task:
+            self._batch_task = self.async_group.spawn(self._batch_timer)
+
+    async def _batch_timer(self):
+        await asyncio.sleep(self._batch_delay)
+
+        self._batch_task = None
+        await self._flush_batch()
+
+    async def _flush_batch(self):
+        async with self._batch_lock:
+            events, self._batch = self._batch, collections.deque()
+            if not events:
+                return
+
+            await self._dispatch_events(events)
+
+    async def _dispatch_events(self, events):
         adapter_events = collections.defaultdict(collections.deque)
+        event_type_names = {}
         for event in events:
-            for name, info in self._infos.items():
-                if not info.subscription.matches(event.type):
-                    continue
+            names = event_type_names.get(event.type)
+            if names is None:
+                names = self._adapter_names.get(event.type)
+                event_type_names[event.type] = names
 
+            for name in names:
                 adapter_events[name].append(event)
 
         for name, events in adapter_events.items():
-            mlog.debug('processing events (adapter: %s; count: %s)',
+            mlog.debug('queuing events (adapter: %s; count: %s)',
                        name, len(events))
-            await aio.call(self._adapters[name].process_events, events)
+            await self._queues[name].put(events)
+
+    async def _adapter_loop(self, name, adapter, queue):
+        try:
+            while True:
+                events = await queue.get()
+
+                if events is None:
+                    if type(adapter).resync is common.Adapter.resync:
+                        mlog.warning('adapter %s events dropped - adapter '
+                                     'does not support resync', name)
+
+                    else:
+                        mlog.warning('adapter %s events dropped - '
+                                     'resyncing adapter', name)
+
+                    await aio.call(adapter.resync)
+                    continue
+
+                mlog.debug('processing events (adapter: %s; count: %s)',
+                           name, len(events))
+                await aio.call(adapter.process_events, events)
+
+        except Exception as e:
+            mlog.error('adapter %s loop error: %s', name, e, exc_info=e)
+
+        finally:
+            self.close()
+
+
+async def _create_adapter(async_group, info, eventer_client):
+    name = info.conf['name']
+    start = time.monotonic()
+
+    mlog.debug('creating adapter %s', name)
+    adapter = await aio.call(info.create_adapter, info.conf, eventer_client)
+    await _bind_resource(async_group, adapter)
+
+    mlog.info('adapter %s created (duration: %.3fs)',
+              name, time.monotonic() - start)
+    return adapter
+
+
+class _AdapterQueue:
+
+    def __init__(self, size, overflow):
+        self._size = size
+        self._overflow = overflow
+        self._batches = collections.deque()
+        self._dropped = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    @property
+    def info(self):
+        lag = (time.monotonic() - self._batches[0].timestamp
+               if self._batches else 0)
+        return QueueInfo(size=len(self._batches),
+                         lag=lag,
+                         dropped=self._dropped)
+
+    async def put(self, events):
+        while self._is_full():
+            if self._overflow == OverflowPolicy.COALESCE:
+                self._batches[-1].events.extend(events)
+                return
+
+            if self._overflow == OverflowPolicy.DROP:
+                self._dropped += len(events) + sum(
+                    len(batch.events) for batch in self._batches
+                    if batch.events is not None)
+                self._batches.clear()
+                self._put(None)
+                return
+
+            await self._not_full.wait()
+
+        self._put(list(events))
+
+    async def get(self):
+        while not self._batches:
+            await self._not_empty.wait()
+
+        batch = self._batches.popleft()
+
+        if not self._batches:
+            self._not_empty.clear()
+
+        if not self._is_full():
+            self._not_full.set()
+
+        return batch.events
+
+    def _put(self, events):
+        self._batches.append(_Batch(events=events,
+                                    timestamp=time.monotonic()))
+        self._not_empty.set()
+
+        if self._is_full():
+            self._not_full.clear()
+
+    def _is_full(self):
+        return bool(self._size) and len(self._batches) >= self._size
+
+
+class _Batch(typing.NamedTuple):
+    events: list[hat.event.common.Event] | None
+    timestamp: float
 
 
 async def _bind_resource(async_group, resource):
@@ -0,0 +1,96 @@
+"""HTTP content encoding"""
+
+import gzip
+
+try:
+    import brotli
+
+except ImportError:
+    brotli = None
+
+
+min_size: int = 256
+"""Minimal size of content which is compressed"""
+
+max_ratio: float = 0.9
+"""Maximal ratio between compressed and original size"""
+
+gzip_level: int = 9
+"""Gzip compression level"""
+
+brotli_quality: int = 9
+"""Brotli compression quality"""
+
+
+def get_encodings() -> list[str]:
+    """Get supported content encodings ordered by preference"""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def compress(body: bytes) -> dict[str, bytes]:
+    """Create compressed variants of content
+
+    Result contains only variants which reduce content size by at least
+    `max_ratio`. Content smaller than `min_size` is not compressed.
+
+    """
+    if len(body) < min_size:
+        return {}
+
+    result = {}
+    for encoding in get_encodings():
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=brotli_quality)
+
+        elif encoding == 'gzip':
+            compressed = gzip.compress(body, compresslevel=gzip_level,
+                                       mtime=0)
+
+        else:
+            raise ValueError('unsupported encoding')
+
+        if len(compressed) > len(body) * max_ratio:
+            continue
+
+        result[encoding] = compressed
+
+    return result
+
+
+def select_encoding(accept_encoding: str,
+                    encodings: dict[str, bytes]
+                    ) -> str | None:
+    """Select content encoding based on `Accept-Encoding` header value"""
+    if not encodings:
+        return
+
+    qualities = {}
+    for i in accept_encoding.split(','):
+        name, *params = i.split(';')
+        quality = 1.0
+
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key != 'q':
+                continue
+
+            try:
+                quality = float(value)
+
+            except ValueError:
+                quality = 0.0
+
+        qualities[name.strip().lower()] = quality
+
+    result = None
+    result_quality = 0.0
+    for encoding in get_encodings():
+        if encoding not in encodings:
+            continue
+
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > result_quality:
+            result = encoding
+            result_quality = quality
+
+    return result
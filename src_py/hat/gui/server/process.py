@@ -0,0 +1,435 @@
+"""Out-of-process adapter hosting
+
+Adapter with ``PROCESS`` hosting is implemented by proxy adapter which
+runs actual adapter implementation in separate child process. Child process
+communicates with GUI server process over local socket pair - events,
+session creation and session requests are sent to child process, while
+session state patches, session notifications, request results and
+eventer client calls are sent back to GUI server process.
+
+"""
+
+from collections.abc import Collection
+import asyncio
+import contextlib
+import itertools
+import logging
+import pickle
+import socket
+import struct
+import sys
+
+from hat import aio
+from hat import json
+import hat.event.common
+import hat.event.eventer
+
+from hat.gui import common
+
+
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+process_close_timeout: float = 5
+"""Time (in seconds) child process has to exit after adapter is closed"""
+
+
+async def create_adapter(conf: common.AdapterConf,
+                         eventer_client: hat.event.eventer.Client
+                         ) -> common.Adapter:
+    """Create proxy adapter hosted in child process"""
+    adapter = ProcessAdapter()
+    adapter._eventer_client = eventer_client
+    adapter._async_group = aio.Group()
+    adapter._sessions = {}
+    adapter._next_session_ids = itertools.count(1)
+    adapter._process = None
+    adapter._conn = None
+
+    adapter.async_group.spawn(aio.call_on_cancel, adapter._on_close)
+
+    try:
+        sock, child_sock = socket.socketpair()
+
+        try:
+            adapter._process = await asyncio.create_subprocess_exec(
+                sys.executable, '-m', 'hat.gui.server.process',
+                str(child_sock.fileno()),
+                pass_fds=[child_sock.fileno()])
+
+        except BaseException:
+            sock.close()
+            raise
+
+        finally:
+            child_sock.close()
+
+        adapter._conn = await _create_connection(
+            sock=sock,
+            request_cb=adapter._on_request,
+            notify_cb=adapter._on_notify)
+        adapter.async_group.spawn(aio.call_on_done,
+                                  adapter._conn.wait_closing(),
+                                  adapter.close)
+
+        await adapter._conn.request('create_adapter', conf)
+
+    except BaseException:
+        await aio.uncancellable(adapter.async_close())
+        raise
+
+    return adapter
+
+
+class ProcessAdapter(common.Adapter):
+    """Proxy adapter"""
+
+    @property
+    def async_group(self) -> aio.Group:
+        return self._async_group
+
+    async def process_events(self, events: Collection[hat.event.common.Event]):
+        await self._conn.request('process_events', list(events))
+
+    async def resync(self):
+        await self._conn.request('resync', None)
+
+    async def create_session(self,
+                             user: str,
+                             roles: set[str],
+                             state: json.Storage,
+                             notify_cb: common.NotifyCb
+                             ) -> common.AdapterSession:
+        session_id = next(self._next_session_ids)
+
+        session = ProcessSession()
+        session._async_group = self.async_group.create_subgroup()
+        session._conn = self._conn
+        session._session_id = session_id
+        session._state = state
+        session._notify_cb = notify_cb
+
+        self._sessions[session_id] = session
+        session.async_group.spawn(aio.call_on_cancel, self._on_session_close,
+                                  session_id)
+
+        try:
+            await self._conn.request('create_session',
+                                     {'session_id': session_id,
+                                      'user': user,
+                                      'roles': set(roles)})
+
+        except BaseException:
+            await aio.uncancellable(session.async_close())
+            raise
+
+        return session
+
+    async def _on_request(self, name, data):
+        if name == 'query':
+            return await self._eventer_client.query(data)
+
+        if name == 'register':
+            return await self._eventer_client.register(
+                data['events'], with_response=data['with_response'])
+
+        raise Exception('unsupported request')
+
+    def _on_notify(self, name, data):
+        session = self._sessions.get(data['session_id'])
+        if not session:
+            return
+
+        if name == 'session_state':
+            session._state.set([], json.patch(session._state.data,
+                                              data['patch']))
+
+        elif name == 'session_notify':
+            session._notify_cb(data['name'], data['data'])
+
+        elif name == 'session_closed':
+            session.close()
+
+    def _on_session_close(self, session_id):
+        self._sessions.pop(session_id, None)
+
+        if self._conn and self._conn.is_open:
+            self._conn.notify('close_session', {'session_id': session_id})
+
+    async def _on_close(self):
+        if self._conn:
+            await self._conn.async_close()
+
+        if not self._process:
+            return
+
+        try:
+            await aio.wait_for(self._process.wait(), process_close_timeout)
+
+        except asyncio.TimeoutError:
+            mlog.warning('child process not closed - killing process')
+            self._process.kill()
+            await self._process.wait()
+
+
+class ProcessSession(common.AdapterSession):
+    """Proxy adapter session"""
+
+    @property
+    def async_group(self) -> aio.Group:
+        return self._async_group
+
+    async def process_request(self,
+                              name: str,
+                              data: json.Data
+                              ) -> json.Data:
+        return await self._conn.request('session_request',
+                                        {'session_id': self._session_id,
+                                         'name': name,
+                                         'data': data})
+
+
+def main():
+    """Child process main"""
+    aio.init_asyncio()
+
+    with contextlib.suppress(asyncio.CancelledError):
+        aio.run_asyncio(async_main(int(sys.argv[1])))
+
+
+async def async_main(fd: int):
+    """Child process async main"""
+    host = _ChildHost()
+    host._adapter = None
+    host._sessions = {}
+    host._conn = await _create_connection(
+        sock=socket.socket(fileno=fd),
+        request_cb=host._on_request,
+        notify_cb=host._on_notify)
+
+    try:
+        await host._conn.wait_closing()
+
+    finally:
+        await aio.uncancellable(host._async_close())
+
+
+class _ChildHost:
+
+    async def _on_request(self, name, data):
+        if name == 'create_adapter':
+            if self._adapter:
+                raise Exception('adapter already created')
+
+            info = common.import_adapter_info(data['module'])
+            eventer_client = _EventerClientProxy(self._conn)
+            self._adapter = await aio.call(info.create_adapter, data,
+                                           eventer_client)
+            self._adapter.async_group.spawn(aio.call_on_done,
+                                            self._adapter.wait_closing(),
+                                            self._conn.close)
+            return
+
+        if not self._adapter:
+            raise Exception('adapter not created')
+
+        if name == 'process_events':
+            await aio.call(self._adapter.process_events, data)
+            return
+
+        if name == 'resync':
+            await aio.call(self._adapter.resync)
+            return
+
+        if name == 'create_session':
+            await self._create_session(data['session_id'], data['user'],
+                                       data['roles'])
+            return
+
+        if name == 'session_request':
+            session = self._sessions.get(data['session_id'])
+            if not session:
+                raise Exception('session not available')
+
+            return await session.process_request(data['name'], data['data'])
+
+        raise Exception('unsupported request')
+
+    def _on_notify(self, name, data):
+        if name == 'close_session':
+            session = self._sessions.get(data['session_id'])
+            if session:
+                session.close()
+
+    async def _create_session(self, session_id, user, roles):
+        state = json.Storage()
+        state_data = state.data
+
+        def on_state_change(data):
+            nonlocal state_data
+            patch = json.diff(state_data, data)
+            state_data = data
+
+            if patch:
+                self._conn.notify('session_state', {'session_id': session_id,
+                                                    'patch': patch})
+
+        def on_notify(name, data):
+            self._conn.notify('session_notify', {'session_id': session_id,
+                                                 'name': name,
+                                                 'data': data})
+
+        state.register_change_cb(on_state_change)
+
+        session = await aio.call(self._adapter.create_session, user, roles,
+                                 state, on_notify)
+        self._sessions[session_id] = session
+
+        session.async_group.spawn(aio.call_on_cancel, self._on_session_close,
+                                  session_id)
+
+    def _on_session_close(self, session_id):
+        self._sessions.pop(session_id, None)
+
+        if self._conn.is_open:
+            self._conn.notify('session_closed', {'session_id': session_id})
+
+    async def _async_close(self):
+        await self._conn.async_close()
+
+        if self._adapter:
+            await self._adapter.async_close()
+
+
+class _EventerClientProxy:
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def query(self,
+                    params: hat.event.common.QueryParams
+                    ) -> hat.event.common.QueryResult:
+        return await self._conn.request('query', params)
+
+    async def register(self,
+                       events: Collection[hat.event.common.RegisterEvent],
+                       with_response: bool = False
+                       ) -> Collection[hat.event.common.Event] | None:
+        return await self._conn.request('register',
+                                        {'events': list(events),
+                                         'with_response': with_response})
+
+
+async def _create_connection(sock, request_cb, notify_cb):
+    conn = _Connection()
+    conn._request_cb = request_cb
+    conn._notify_cb = notify_cb
+    conn._async_group = aio.Group()
+    conn._next_request_ids = itertools.count(1)
+    conn._request_futures = {}
+
+    try:
+        conn._reader, conn._writer = await asyncio.open_connection(sock=sock)
+
+    except BaseException:
+        sock.close()
+        raise
+
+    conn.async_group.spawn(conn._read_loop)
+
+    return conn
+
+
+class _Connection(aio.Resource):
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    async def request(self, name, data):
+        if not self.is_open:
+            raise ConnectionError()
+
+        request_id = next(self._next_request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._request_futures[request_id] = future
+
+        try:
+            self._send(('request', request_id, name, data))
+            await self._writer.drain()
+            return await future
+
+        finally:
+            self._request_futures.pop(request_id, None)
+
+    def notify(self, name, data):
+        if not self.is_open:
+            raise ConnectionError()
+
+        self._send(('notify', name, data))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                msg_len_bytes = await self._reader.readexactly(4)
+                msg_len = struct.unpack('>I', msg_len_bytes)[0]
+                msg_bytes = await self._reader.readexactly(msg_len)
+                msg = pickle.loads(msg_bytes)
+
+                if msg[0] == 'request':
+                    _, request_id, name, data = msg
+                    self.async_group.spawn(self._process_request, request_id,
+                                           name, data)
+
+                elif msg[0] == 'response':
+                    _, request_id, success, data = msg
+                    future = self._request_futures.get(request_id)
+                    if not future or future.done():
+                        continue
+
+                    if success:
+                        future.set_result(data)
+
+                    else:
+                        future.set_exception(Exception(data))
+
+                elif msg[0] == 'notify':
+                    _, name, data = msg
+                    self._notify_cb(name, data)
+
+                else:
+                    raise Exception('unsupported message')
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        except Exception as e:
+            mlog.error('read loop error: %s', e, exc_info=e)
+
+        finally:
+            self.close()
+            self._writer.close()
+
+            for future in self._request_futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError())
+
+    async def _process_request(self, request_id, name, data):
+        try:
+            result = await aio.call(self._request_cb, name, data)
+            msg = ('response', request_id, True, result)
+
+        except Exception as e:
+            mlog.debug('request %s error: %s', name, e, exc_info=e)
+            msg = ('response', request_id, False, str(e))
+
+        if self.is_open:
+            self._send(msg)
+
+    def _send(self, msg):
+        msg_bytes = pickle.dumps(msg, protocol=pickle.HIGHEST_PROTOCOL)
+        self._writer.write(struct.pack('>I', len(msg_bytes)) + msg_bytes)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
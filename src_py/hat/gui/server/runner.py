@@ -1,7 +1,9 @@
 from collections.abc import Collection
+from pathlib import Path
 import asyncio
 import collections
 import logging
+import time
 
 from hat import aio
 from hat import json
@@ -26,7 +28,11 @@ class MainRunner(aio.Resource):
         self._loop = asyncio.get_running_loop()
         self._async_group = aio.Group()
         self._user_manager = hat.gui.server.user.UserManager(conf['users'])
-        self._view_manager = hat.gui.server.view.ViewManager(conf['views'])
+        self._view_manager = hat.gui.server.view.ViewManager(
+            view_confs=conf['views'],
+            cache_size=conf.get('view_cache_size'),
+            parse_cache_path=(Path(conf['view_parse_cache_path'])
+                              if 'view_parse_cache_path' in conf else None))
         self._adapter_infos = collections.deque()
         self._eventer_component = None
         self._eventer_client = None
@@ -55,6 +61,14 @@ class MainRunner(aio.Resource):
 
     async def _start(self):
         event_server_conf = self._conf['event_server']
+        preload_views_conf = self._conf.get('preload_views')
+
+        if preload_views_conf is not None:
+            if preload_views_conf.get('wait', True):
+                await self._preload_views()
+
+            else:
+                self.async_group.spawn(self._preload_views)
 
         for adapter_conf in self._conf['adapters']:
             adapter_info = await hat.gui.server.adapter.create_conf_adapter_info(  # NOQA
@@ -108,6 +122,29 @@ class MainRunner(aio.Resource):
         else:
             raise Exception('invalid configuration')
 
+    async def _preload_views(self):
+        mlog.debug("preloading views")
+        start = time.monotonic()
+
+        await asyncio.gather(*(self._preload_view(view_conf['name'])
+                               for view_conf in self._conf['views']))
+
+        mlog.info("views preloaded (duration: %.3fs)",
+                  time.monotonic() - start)
+
+    async def _preload_view(self, name):
+        start = time.monotonic()
+
+        try:
+            await self._view_manager.get(name)
+
+        except Exception as e:
+            mlog.warning("view %s preload error: %s", name, e, exc_info=e)
+            return
+
+        mlog.info("view %s preloaded (duration: %.3fs)",
+                  name, time.monotonic() - start)
+
     async def _stop(self):
         if self._eventer_runner and not self._eventer_component:
             await self._eventer_runner.async_close()
@@ -299,10 +336,18 @@ class ServerRunner(aio.Resource):
             await aio.uncancellable(self._stop())
 
     async def _start(self):
+        event_batching_conf = self._conf.get('event_batching', {})
+
         mlog.debug("creating adapter manager")
         self._adapter_manager = await hat.gui.server.adapter.create_manager(
             infos=self._adapter_infos,
-            eventer_client=self._eventer_client)
+            eventer_client=self._eventer_client,
+            parallelism=self._conf.get('adapter_parallelism'),
+            batch_delay=event_batching_conf.get('delay'),
+            batch_size=event_batching_conf.get('size'),
+            urgent_event_types=[
+                tuple(i)
+                for i in event_batching_conf.get('urgent_event_types', [])])
         _bind_resource(self.async_group, self._adapter_manager)
 
         while self._events_queue:
@@ -324,6 +369,37 @@ class ServerRunner(aio.Resource):
             eventer_client=self._eventer_client)
         _bind_resource(self.async_group, self._server)
 
+        status_period = self._conf.get('status_period')
+        if status_period:
+            self.async_group.spawn(self._status_loop, status_period)
+
+    async def _status_loop(self, status_period):
+        event_type = ('gui', self._conf['name'], 'status')
+        last_status = None
+
+        try:
+            while True:
+                status = _get_status(self._adapter_manager,
+                                     self._view_manager)
+                mlog.debug("status: %s", status)
+
+                if status != last_status:
+                    await self._eventer_client.register([
+                        hat.event.common.RegisterEvent(
+                            type=event_type,
+                            source_timestamp=None,
+                            payload=hat.event.common.EventPayloadJson(
+                                status))])
+                    last_status = status
+
+                await asyncio.sleep(status_period)
+
+        except ConnectionError:
+            pass
+
+        except Exception as e:
+            mlog.error("status loop error: %s", e, exc_info=e)
+
     async def _stop(self):
         if self._server:
             await self._server.async_close()
@@ -332,6 +408,22 @@ class ServerRunner(aio.Resource):
             await self._adapter_manager.async_close()
 
 
+def _get_status(adapter_manager, view_manager):
+    view_cache_info = view_manager.cache_info
+
+    return {
+        'adapters': {
+            name: {'queue_size': info.size,
+                   'queue_lag': round(info.lag, 3),
+                   'dropped': info.dropped}
+            for name, info in adapter_manager.queue_infos.items()},
+        'view_cache': {'hits': view_cache_info.hits,
+                       'misses': view_cache_info.misses,
+                       'evictions': view_cache_info.evictions,
+                       'size': view_cache_info.size,
+                       'max_size': view_cache_info.max_size}}
+
+
 def _bind_resource(async_group, resource):
     async_group.spawn(aio.call_on_done, resource.wait_closing(),
                       async_group.close)
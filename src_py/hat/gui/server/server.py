@@ -3,8 +3,12 @@
 import asyncio
 import contextlib
 import functools
+import hashlib
 import importlib.resources
 import logging
+import mimetypes
+import typing
+import urllib.parse
 
 import aiohttp.web
 
@@ -16,11 +20,16 @@ import hat.event.common
 import hat.gui.server.user
 import hat.gui.server.view
 import hat.gui.server.adapter
+import hat.gui.server.encoding
 
 
 mlog: logging.Logger = logging.getLogger(__name__)
 """Module logger"""
 
+_no_cache_headers = {'Cache-Control': 'no-cache'}
+
+_ui_files_cache = {}
+
 
 async def create_server(host: str,
                         port: int,
@@ -43,6 +52,7 @@ async def create_server(host: str,
     server._adapter_manager = adapter_manager
     server._eventer_client = eventer_client
     server._clients = {}
+    server._view_file_digests = {}
 
     exit_stack = contextlib.ExitStack()
     try:
@@ -50,17 +60,28 @@ async def create_server(host: str,
             importlib.resources.as_file(
                 importlib.resources.files(__package__) / 'ui'))
 
-        additional_routes = [aiohttp.web.get('/client_conf',
-                                             server._get_client_conf)]
+        ui_files = _ui_files_cache.get(ui_path)
+        if ui_files is None:
+            ui_files = await asyncio.get_running_loop().run_in_executor(
+                None, _ext_get_ui_files, ui_path)
+            _ui_files_cache[ui_path] = ui_files
+
+        server._ui_files = ui_files
+
+        additional_routes = [
+            aiohttp.web.get('/client_conf', server._get_client_conf),
+            aiohttp.web.get('/views/{view}/{digest}/{path:.+}',
+                            server._get_view_file),
+            aiohttp.web.get('/{path:.*}', server._get_ui_file)]
 
         server._srv = await juggler.listen(host=host,
                                            port=port,
                                            connection_cb=server._on_connection,
                                            request_cb=server._on_request,
-                                           static_dir=ui_path,
                                            autoflush_delay=autoflush_delay,
                                            parallel_requests=True,
-                                           additional_routes=additional_routes)
+                                           additional_routes=additional_routes,
+                                           no_cache=False)
 
         try:
             server.async_group.spawn(aio.call_on_cancel, exit_stack.close)
@@ -86,7 +107,68 @@ class Server(aio.Resource):
         return self._srv.async_group
 
     async def _get_client_conf(self, req):
-        return aiohttp.web.json_response(self._client_conf)
+        return aiohttp.web.json_response(self._client_conf,
+                                         headers=_no_cache_headers)
+
+    async def _get_ui_file(self, req):
+        ui_file = self._ui_files.get(req.match_info['path'])
+        if not ui_file:
+            raise aiohttp.web.HTTPNotFound()
+
+        return _create_file_response(req=req,
+                                     body=ui_file.body,
+                                     encodings=ui_file.encodings,
+                                     digest=ui_file.digest,
+                                     content_type=ui_file.content_type,
+                                     charset=None,
+                                     cache_control='no-cache')
+
+    async def _get_view_file(self, req):
+        view_name = req.match_info['view']
+        digest = req.match_info['digest']
+        file_name = req.match_info['path']
+
+        view = self._view_manager.get_cached(view_name)
+        view_file = view.files.get(file_name) if view else None
+
+        if not view_file or view_file.digest != digest:
+            file_digests = self._view_file_digests.get(view_name, {})
+            if file_digests.get(file_name) != digest:
+                raise aiohttp.web.HTTPNotFound()
+
+            try:
+                view = await self._view_manager.get(view_name)
+
+            except Exception:
+                raise aiohttp.web.HTTPNotFound()
+
+            view_file = view.files.get(file_name)
+
+        if not view_file or view_file.digest != digest:
+            raise aiohttp.web.HTTPNotFound()
+
+        if view_file.type == hat.gui.server.view.ViewFileType.TEXT:
+            content_type = (mimetypes.guess_type(file_name)[0] or
+                            'text/plain')
+            charset = 'utf-8'
+
+        elif view_file.type == hat.gui.server.view.ViewFileType.JSON:
+            content_type = 'application/json'
+            charset = 'utf-8'
+
+        else:
+            content_type = (mimetypes.guess_type(file_name)[0] or
+                            'application/octet-stream')
+            charset = None
+
+        return _create_file_response(
+            req=req,
+            body=view_file.body,
+            encodings=view_file.encodings,
+            digest=view_file.digest,
+            content_type=content_type,
+            charset=charset,
+            cache_control='public, max-age=31536000, immutable')
 
     async def _on_connection(self, conn):
         try:
@@ -96,7 +178,8 @@ class Server(aio.Resource):
                             user_manager=self._user_manager,
                             view_manager=self._view_manager,
                             adapter_manager=self._adapter_manager,
-                            user_change_cb=self._on_user_change)
+                            user_change_cb=self._on_user_change,
+                            view_manifest_cb=self._on_view_manifest)
             self._clients[conn] = client
 
             await client.wait_closing()
@@ -118,6 +201,11 @@ class Server(aio.Resource):
 
         return await client.process_request(name, data)
 
+    def _on_view_manifest(self, view):
+        self._view_file_digests[view.name] = {
+            file_name: view_file.digest
+            for file_name, view_file in view.files.items()}
+
     async def _on_user_change(self):
         event = hat.event.common.RegisterEvent(
             type=('gui', self._name, 'clients'),
@@ -142,6 +230,8 @@ class Client(aio.Resource):
                  view_manager: hat.gui.server.view.ViewManager,
                  adapter_manager: hat.gui.server.adapter.AdapterManager,
                  user_change_cb: aio.AsyncCallable[[], None],
+                 view_manifest_cb: typing.Callable[[hat.gui.server.view.View],
+                                                   None],
                  req_queue_size: int = 0):
         self._conn = conn
         self._initial_view = initial_view
@@ -149,9 +239,11 @@ class Client(aio.Resource):
         self._view_manager = view_manager
         self._adapter_manager = adapter_manager
         self._user_change_cb = user_change_cb
+        self._view_manifest_cb = view_manifest_cb
         self._loop = asyncio.get_running_loop()
         self._req_queue = aio.Queue(req_queue_size)
         self._user = None
+        self._view_digests = set()
 
         self.async_group.spawn(self._client_loop)
 
@@ -263,6 +355,10 @@ class Client(aio.Resource):
                     await self._set_user(None)
                     return
 
+                elif req_adapter is None and req_name == 'view_digests':
+                    mlog.debug("updating client view digests")
+                    self._view_digests = set(req_data)
+
                 elif req_adapter is None and req_name == 'login':
                     try:
                         user = self._user_manager.authenticate(
@@ -297,6 +393,13 @@ class Client(aio.Resource):
         else:
             view = None
 
+        if view and view.digest not in self._view_digests:
+            view_manifest = _get_view_manifest(view)
+            self._view_manifest_cb(view)
+
+        else:
+            view_manifest = None
+
         self._conn.state.set([], {name: session.state.data
                                   for name, session in sessions.items()})
         await self._conn.flush()
@@ -304,7 +407,8 @@ class Client(aio.Resource):
         await self._conn.notify('init', {
             'user': (self._user.name if self._user else None),
             'roles': (list(self._user.roles) if self._user else []),
-            'view': (view.data if view else None),
+            'view': view_manifest,
+            'view_digest': (view.digest if view else None),
             'conf': (view.conf if view else None)})
 
     def _notify(self, adapter_name, name, data):
@@ -398,6 +502,61 @@ class _AdapterSessionProxy(aio.Resource):
                 future.set_exception(ConnectionError())
 
 
+class _UiFile(typing.NamedTuple):
+    content_type: str
+    digest: str
+    body: bytes
+    encodings: dict[str, bytes]
+
+
+def _ext_get_ui_files(ui_path):
+    ui_files = {}
+    for i in ui_path.rglob('*'):
+        if i.is_dir():
+            continue
+
+        body = i.read_bytes()
+        content_type = (mimetypes.guess_type(i.name)[0] or
+                        'application/octet-stream')
+
+        ui_files[i.relative_to(ui_path).as_posix()] = _UiFile(
+            content_type=content_type,
+            digest=hashlib.sha256(body).hexdigest(),
+            body=body,
+            encodings=hat.gui.server.encoding.compress(body))
+
+    return ui_files
+
+
+def _create_file_response(req, body, encodings, digest, content_type,
+                          charset, cache_control):
+    headers = {'Cache-Control': cache_control,
+               'ETag': f'W/"{digest}"',
+               'Vary': 'Accept-Encoding'}
+
+    if f'"{digest}"' in req.headers.get('If-None-Match', ''):
+        raise aiohttp.web.HTTPNotModified(headers=headers)
+
+    encoding = hat.gui.server.encoding.select_encoding(
+        req.headers.get('Accept-Encoding', ''), encodings)
+    if encoding:
+        body = encodings[encoding]
+        headers['Content-Encoding'] = encoding
+
+    return aiohttp.web.Response(body=body,
+                                content_type=content_type,
+                                charset=charset,
+                                headers=headers)
+
+
+def _get_view_manifest(view):
+    view_name = urllib.parse.quote(view.name, safe='')
+    return {file_name: {'type': view_file.type.value,
+                        'url': (f'/views/{view_name}/{view_file.digest}/'
+                                f'{urllib.parse.quote(file_name)}')}
+            for file_name, view_file in view.files.items()}
+
+
 def _parse_req_name(name):
     segments = name.split('/', 1)
 
@@ -1,35 +1,159 @@
 """View manager implementation"""
 
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 from pathlib import Path
-import base64
+import asyncio
+import collections
+import concurrent.futures
+import enum
+import hashlib
+import importlib.metadata
 import importlib.resources
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import threading
+import time
 import typing
 
 from hat import aio
 from hat import json
 
+import hat.gui.server.encoding
+
+
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+
+class ViewFileType(enum.Enum):
+    TEXT = 'TEXT'
+    JSON = 'JSON'
+    BINARY = 'BINARY'
+
+
+class ViewFile(typing.NamedTuple):
+    """View file
+
+    View file `body` contains encoded file content as it should be provided
+    to clients. `digest` is SHA256 hex digest of `body`. If `type` is
+    ``ViewFileType.TEXT``, `body` contains `utf-8` encoded text. If
+    `type` is ``ViewFileType.JSON``, `body` contains `utf-8` encoded JSON
+    representation of view data associated with this file. If `type` is
+    ``ViewFileType.BINARY``, `body` contains raw file content.
+
+    `encodings` contains precompressed `body` variants identified by HTTP
+    content encoding.
+
+    """
+    type: ViewFileType
+    digest: str
+    body: bytes
+    encodings: dict[str, bytes]
+
 
 class View(typing.NamedTuple):
-    """View data"""
+    """View data
+
+    View `data` provides decoded content of each view file. Content is not
+    kept in memory - it is decoded from `body` of associated view file each
+    time it is accessed. Content of binary files is `body` itself.
+
+    """
     name: str
     conf: json.Data
-    data: dict[str, json.Data]
+    data: Mapping[str, json.Data | bytes]
+    digest: str
+    files: dict[str, ViewFile]
+
+
+class CacheInfo(typing.NamedTuple):
+    """View cache info
+
+    `size` is estimated memory size (in bytes) of all cached views.
+
+    """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int | None
 
 
 class ViewManager(aio.Resource):
-    """View manager"""
+    """View manager
+
+    Loaded views are cached. Each cached view is revalidated by comparing
+    modification time and size of view's files (including configuration
+    file) with values obtained when view was loaded. Files modified during
+    last `stamp_delay` seconds are considered unstable and are always read
+    again. If view files are read again, but their content remains the same
+    (identified by content digest), previously parsed data is reused.
+    Builtin views are read only once. View archives (created with
+    `create_archive`) are revalidated as single file and contain already
+    parsed view data.
+
+    If `cache_size` is set, it limits estimated memory size (in bytes) of
+    all cached views. Once this limit is exceeded, least recently used views
+    are removed from cache. Most recently loaded view is always cached.
+
+    Large XML/SVG files are parsed in separate processes. If
+    `parse_cache_path` is set, virtual trees obtained by parsing XML/SVG
+    files are stored in this directory and reused for files with same
+    content digest.
+
+    """
 
-    def __init__(self, view_confs: Iterable[json.Data]):
+    def __init__(self,
+                 view_confs: Iterable[json.Data],
+                 stamp_delay: float = 2,
+                 cache_size: int | None = None,
+                 parse_cache_path: Path | None = None):
         self._view_confs = {view_conf['name']: view_conf
                             for view_conf in view_confs}
+        self._stamp_delay = stamp_delay
+        self._cache_size = cache_size
+        self._parse_cache_path = parse_cache_path
         self._executor = aio.Executor(log_exceptions=False)
+        self._process_executor = aio.Executor(
+            None, multiprocessing.get_context('spawn'),
+            executor_cls=concurrent.futures.ProcessPoolExecutor,
+            log_exceptions=False)
+        self._cache = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self.async_group.spawn(aio.call_on_cancel,
+                               self._process_executor.async_close)
 
     @property
     def async_group(self) -> aio.Group:
         """Async group"""
         return self._executor.async_group
 
+    @property
+    def cache_info(self) -> CacheInfo:
+        """Cache info"""
+        return CacheInfo(hits=self._hits,
+                         misses=self._misses,
+                         evictions=self._evictions,
+                         size=sum(i.size for i in self._cache.values()),
+                         max_size=self._cache_size)
+
+    def get_cached(self,
+                   name: str
+                   ) -> View | None:
+        """Get cached view without revalidation"""
+        entry = self._cache.get(name)
+        if not entry:
+            return
+
+        self._cache.move_to_end(name)
+        return entry.view
+
     async def get(self,
                   name: str
                   ) -> View:
@@ -38,70 +162,488 @@ class ViewManager(aio.Resource):
             raise Exception('view manager is not open')
 
         conf = self._view_confs[name]
+        entry = self._cache.get(name)
+
+        view_path = None
+        archive_path = None
 
         if 'view_path' in conf:
-            view_data = await self._executor.spawn(_ext_get_view_data,
-                                                   Path(conf['view_path']))
+            view_path = Path(conf['view_path'])
+            view_stamp = await self._executor.spawn(_ext_get_dir_stamp,
+                                                    view_path,
+                                                    self._stamp_delay)
+
+        elif 'view_archive' in conf:
+            archive_path = Path(conf['view_archive'])
+            view_stamp = await self._executor.spawn(_ext_get_file_stamp,
+                                                    archive_path,
+                                                    self._stamp_delay)
 
         elif 'builtin' in conf:
-            view_data = await self._executor.spawn(_ext_get_builtin_view_data,
-                                                   conf['builtin'])
+            view_stamp = ()
 
         else:
             raise ValueError('unknown view data path')
 
         if 'conf_path' in conf:
-            view_conf = await self._executor.spawn(json.decode_file,
-                                                   Path(conf['conf_path']))
+            conf_path = Path(conf['conf_path'])
+            conf_stamp = await self._executor.spawn(_ext_get_file_stamp,
+                                                    conf_path,
+                                                    self._stamp_delay)
 
         elif 'conf' in conf:
-            view_conf = conf['conf']
+            conf_path = None
+            conf_stamp = ()
 
         else:
             raise ValueError('unknown view conf')
 
-        schema = (view_data.get('schema.json') or
-                  view_data.get('schema.yaml') or
-                  view_data.get('schema.yml'))
-        if schema is not None:
-            repo = json.create_schema_repository(schema)
-            validator = json.DefaultSchemaValidator(repo)
-            validator.validate(schema['id'], view_conf)
+        if (entry and
+                view_stamp is not None and
+                conf_stamp is not None and
+                entry.view_stamp == view_stamp and
+                entry.conf_stamp == conf_stamp):
+            self._hits += 1
+            self._cache.move_to_end(name)
+            return entry.view
+
+        self._misses += 1
+
+        if archive_path is not None:
+            file_digests, view_files = await self._executor.spawn(
+                _ext_read_archive, archive_path)
+            digest = _get_view_digest(file_digests)
+
+            if entry and entry.view.digest == digest:
+                view_data = entry.view.data
+                view_files = entry.view.files
+                size = entry.size
+
+            else:
+                view_data = _ViewData(view_files)
+                size = await self._executor.spawn(_ext_get_view_size,
+                                                  view_files)
+
+        else:
+            if view_path is not None:
+                files = await self._executor.spawn(_ext_read_files, view_path)
+
+            else:
+                files = await self._executor.spawn(_ext_read_builtin_files,
+                                                   conf['builtin'])
+
+            file_digests = await self._executor.spawn(_ext_get_file_digests,
+                                                      files)
+            digest = _get_view_digest(file_digests)
+
+            if entry and entry.view.digest == digest:
+                view_data = entry.view.data
+                view_files = entry.view.files
+                size = entry.size
+
+            else:
+                files_data = await self._get_view_data(files, file_digests)
+                view_files = await self._executor.spawn(_ext_get_view_files,
+                                                        files, file_digests,
+                                                        files_data)
+                del files_data
+
+                view_data = _ViewData(view_files)
+                size = await self._executor.spawn(_ext_get_view_size,
+                                                  view_files)
 
-        return View(name=name,
+        if conf_path is not None:
+            view_conf, conf_digest = await self._executor.spawn(
+                _ext_read_conf, conf_path)
+
+        else:
+            view_conf, conf_digest = conf['conf'], None
+
+        schema_name = next((i for i in _schema_names if i in view_data),
+                           None)
+
+        if schema_name is not None:
+            schema_digest = file_digests[schema_name]
+
+            if entry and entry.schema_digest == schema_digest:
+                schema_id = entry.schema_id
+                validator = entry.validator
+
+            else:
+                schema = view_data[schema_name]
+                schema_id = schema['id']
+                repo = json.create_schema_repository(schema)
+                validator = json.DefaultSchemaValidator(repo)
+
+            validated = schema_digest, conf_digest
+            if not entry or entry.validated != validated:
+                validator.validate(schema_id, view_conf)
+
+        else:
+            schema_digest = None
+            schema_id = None
+            validator = None
+            validated = None
+
+        view = View(name=name,
                     conf=view_conf,
-                    data=view_data)
+                    data=view_data,
+                    digest=digest,
+                    files=view_files)
+
+        self._cache[name] = _CacheEntry(view=view,
+                                        view_stamp=view_stamp,
+                                        conf_stamp=conf_stamp,
+                                        schema_digest=schema_digest,
+                                        schema_id=schema_id,
+                                        validator=validator,
+                                        validated=validated,
+                                        size=size)
+        self._cache.move_to_end(name)
+        self._evict()
+
+        return view
+
+    async def _get_view_data(self, files, file_digests):
+        view_data = await self._executor.spawn(_ext_get_view_data, files)
+
+        xml_file_names = [file_name for file_name in files.keys()
+                          if Path(file_name).suffix in _xml_suffixes]
+        xml_data = await asyncio.gather(
+            *(self._parse_xml(files[file_name], file_digests[file_name])
+              for file_name in xml_file_names))
+
+        view_data.update(zip(xml_file_names, xml_data))
+        return view_data
+
+    async def _parse_xml(self, content, digest):
+        if self._parse_cache_path:
+            data = await self._executor.spawn(_ext_read_parse_cache,
+                                              self._parse_cache_path, digest)
+            if data is not None:
+                return data
+
+        if len(content) < _process_parse_min_size:
+            data = await self._executor.spawn(_ext_parse_xml, content)
+
+        else:
+            data = await self._process_executor.spawn(_ext_parse_xml,
+                                                      content)
+
+        if self._parse_cache_path:
+            try:
+                await self._executor.spawn(_ext_write_parse_cache,
+                                           self._parse_cache_path, digest,
+                                           data)
+
+            except Exception as e:
+                mlog.warning("error writing parse cache: %s", e, exc_info=e)
+
+        return data
+
+    def _evict(self):
+        if self._cache_size is None:
+            return
+
+        size = sum(i.size for i in self._cache.values())
+        while size > self._cache_size and len(self._cache) > 1:
+            name, entry = self._cache.popitem(last=False)
+            size -= entry.size
+            self._evictions += 1
+
+            mlog.debug("view %s removed from cache (size: %s)",
+                       name, entry.size)
+
+
+def create_archive(view_path: Path,
+                   archive_path: Path):
+    """Create view archive
+
+    View archive is single file containing all files from `view_path`
+    directory. Together with content of each file, archive contains its
+    parsed data and precompressed variants. View loaded from archive is
+    equal to view loaded from `view_path` directory.
+
+    Archive is written to temporary file which replaces `archive_path` once
+    writing is finished.
+
+    """
+    files = _ext_read_files(view_path)
+    file_digests = _ext_get_file_digests(files)
+
+    view_data = _ext_get_view_data(files)
+    view_data.update((file_name, _ext_parse_xml(content))
+                     for file_name, content in files.items()
+                     if Path(file_name).suffix in _xml_suffixes)
+
+    view_files = _ext_get_view_files(files, file_digests, view_data)
+
+    _ext_write_archive(archive_path, file_digests, view_files)
+
+
+class _CacheEntry(typing.NamedTuple):
+    view: View
+    view_stamp: tuple | None
+    conf_stamp: tuple | None
+    schema_digest: str | None
+    schema_id: str | None
+    validator: json.SchemaValidator | None
+    validated: tuple[str, str | None] | None
+    size: int
+
+
+class _ViewData(Mapping):
+
+    def __init__(self, view_files):
+        self._view_files = view_files
+
+    def __getitem__(self, file_name):
+        view_file = self._view_files[file_name]
 
+        if view_file.type == ViewFileType.TEXT:
+            return str(view_file.body, 'utf-8')
 
-def _ext_get_builtin_view_data(builtin_name):
+        if view_file.type == ViewFileType.JSON:
+            return json.decode(str(view_file.body, 'utf-8'))
+
+        return view_file.body
+
+    def __iter__(self):
+        return iter(self._view_files)
+
+    def __len__(self):
+        return len(self._view_files)
+
+
+_schema_names = ['schema.json', 'schema.yaml', 'schema.yml']
+
+_text_suffixes = {'.js', '.css', '.txt'}
+
+_json_suffixes = {'.json', '.yaml', '.yml', '.toml'}
+
+_xml_suffixes = {'.xml', '.svg'}
+
+_process_parse_min_size = 64 * 1024
+
+_parse_cache_version = f"vt-{importlib.metadata.version('hat-json')}"
+
+_archive_magic = b'HATGUIVA'
+
+_archive_version = 1
+
+
+def _get_view_digest(file_digests):
+    h = hashlib.sha256()
+    for file_name, file_digest in sorted(file_digests.items()):
+        h.update(json.encode([file_name, file_digest]).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _ext_get_file_digests(files):
+    return {file_name: hashlib.sha256(content).hexdigest()
+            for file_name, content in files.items()}
+
+
+def _ext_read_conf(conf_path):
+    content = conf_path.read_bytes()
+    conf = json.decode(content.decode('utf-8'),
+                       json.get_file_format(conf_path))
+    return conf, hashlib.sha256(content).hexdigest()
+
+
+def _ext_get_dir_stamp(view_path, stamp_delay):
+    stamp = []
+    for i in view_path.rglob('*'):
+        if i.is_dir():
+            continue
+
+        file_stamp = _ext_get_file_stamp(i, stamp_delay)
+        if file_stamp is None:
+            return
+
+        stamp.append((i.relative_to(view_path).as_posix(), *file_stamp))
+
+    return tuple(sorted(stamp))
+
+
+def _ext_get_file_stamp(path, stamp_delay):
+    stat = path.stat()
+    if time.time_ns() - stat.st_mtime_ns < stamp_delay * 1e9:
+        return
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _ext_read_builtin_files(builtin_name):
     with importlib.resources.as_file(importlib.resources.files(__package__) /
                                      'views') as _path:
-        return _ext_get_view_data(_path / builtin_name)
+        return _ext_read_files(_path / builtin_name)
 
 
-def _ext_get_view_data(view_path):
-    data = {}
+def _ext_read_files(view_path):
+    files = {}
     for i in view_path.rglob('*'):
         if i.is_dir():
             continue
 
-        if i.suffix in {'.js', '.css', '.txt'}:
-            with open(i, encoding='utf-8') as f:
-                content = f.read()
+        file_name = i.relative_to(view_path).as_posix()
+        files[file_name] = i.read_bytes()
 
-        elif i.suffix in {'.json', '.yaml', '.yml', '.toml'}:
-            content = json.decode_file(i)
+    return files
 
-        elif i.suffix in {'.xml', '.svg'}:
-            with open(i, encoding='utf-8') as f:
-                content = json.vt.parse(f)
 
-        else:
-            with open(i, 'rb') as f:
-                content = f.read()
-            content = base64.b64encode(content).decode('utf-8')
+def _ext_get_view_data(files):
+    data = {}
+    for file_name, content in files.items():
+        suffix = Path(file_name).suffix
+
+        if suffix in _text_suffixes:
+            content = content.decode('utf-8')
+
+        elif suffix in _json_suffixes:
+            content = json.decode(content.decode('utf-8'),
+                                  json.get_file_format(Path(file_name)))
+
+        elif suffix in _xml_suffixes:
+            continue
 
-        file_name = i.relative_to(view_path).as_posix()
         data[file_name] = content
 
     return data
+
+
+def _ext_parse_xml(content):
+    return json.vt.parse(io.BytesIO(content))
+
+
+def _ext_read_parse_cache(parse_cache_path, digest):
+    path = parse_cache_path / _parse_cache_version / f'{digest}.json'
+
+    try:
+        return json.decode_file(path)
+
+    except Exception:
+        return
+
+
+def _ext_write_parse_cache(parse_cache_path, digest, data):
+    path = parse_cache_path / _parse_cache_version / f'{digest}.json'
+    tmp_path = path.with_name(
+        f'{digest}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    json.encode_file(data, tmp_path, json.Format.JSON, indent=None)
+    tmp_path.replace(path)
+
+
+def _ext_write_archive(archive_path, file_digests, view_files):
+    blobs = collections.deque()
+    blobs_size = 0
+
+    def add_blob(blob):
+        nonlocal blobs_size
+        blobs.append(blob)
+        blobs_size += len(blob)
+        return [blobs_size - len(blob), len(blob)]
+
+    files_header = {}
+    for file_name, view_file in view_files.items():
+        files_header[file_name] = {
+            'type': view_file.type.value,
+            'digest': file_digests[file_name],
+            'body_digest': view_file.digest,
+            'body': add_blob(view_file.body),
+            'encodings': {encoding: add_blob(body)
+                          for encoding, body in view_file.encodings.items()}}
+
+    header = json.encode({'version': _archive_version,
+                          'files': files_header}).encode('utf-8')
+    tmp_path = archive_path.with_name(
+        f'{archive_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+    with open(tmp_path, 'wb') as f:
+        f.write(_archive_magic)
+        f.write(len(header).to_bytes(4, 'big'))
+        f.write(header)
+
+        for blob in blobs:
+            f.write(blob)
+
+    tmp_path.replace(archive_path)
+
+
+def _ext_read_archive(archive_path):
+    with open(archive_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if hasattr(m, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                m.madvise(mmap.MADV_SEQUENTIAL)
+
+            if m[:len(_archive_magic)] != _archive_magic:
+                raise Exception('invalid view archive')
+
+            header_start = len(_archive_magic) + 4
+            header_size = int.from_bytes(m[len(_archive_magic):header_start],
+                                         'big')
+            blobs_start = header_start + header_size
+            header = json.decode(m[header_start:blobs_start].decode('utf-8'))
+
+            if header['version'] != _archive_version:
+                raise Exception('unsupported view archive version')
+
+            def get_blob(blob):
+                start = blobs_start + blob[0]
+                return m[start:start + blob[1]]
+
+            file_digests = {}
+            view_files = {}
+
+            for file_name, file_header in header['files'].items():
+                file_digests[file_name] = file_header['digest']
+                view_files[file_name] = ViewFile(
+                    type=ViewFileType(file_header['type']),
+                    digest=file_header['body_digest'],
+                    body=get_blob(file_header['body']),
+                    encodings={encoding: get_blob(blob)
+                               for encoding, blob
+                               in file_header['encodings'].items()})
+
+    return file_digests, view_files
+
+
+def _ext_get_view_files(files, file_digests, data):
+    view_files = {}
+    for file_name, content in files.items():
+        suffix = Path(file_name).suffix
+
+        if suffix in _text_suffixes:
+            file_type = ViewFileType.TEXT
+            body = content
+            digest = file_digests[file_name]
+
+        elif suffix in _json_suffixes or suffix in _xml_suffixes:
+            file_type = ViewFileType.JSON
+            body = json.encode(data[file_name]).encode('utf-8')
+            digest = hashlib.sha256(body).hexdigest()
+
+        else:
+            file_type = ViewFileType.BINARY
+            body = content
+            digest = file_digests[file_name]
+
+        view_files[file_name] = ViewFile(
+            type=file_type,
+            digest=digest,
+            body=body,
+            encodings=hat.gui.server.encoding.compress(body))
+
+    return view_files
+
+
+def _ext_get_view_size(files):
+    size = 0
+
+    for view_file in files.values():
+        size += len(view_file.body)
+        size += sum(len(i) for i in view_file.encodings.values())
+
+    return size
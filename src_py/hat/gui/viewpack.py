@@ -0,0 +1,28 @@
+"""Hat GUI view archive util"""
+
+from pathlib import Path
+import argparse
+import sys
+
+import hat.gui.server.view
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    """Create argument parser"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('view_path', metavar='VIEW_PATH', type=Path)
+    parser.add_argument('archive_path', metavar='ARCHIVE_PATH', type=Path)
+    return parser
+
+
+def main():
+    """Main"""
+    parser = create_argument_parser()
+    args = parser.parse_args()
+
+    hat.gui.server.view.create_archive(args.view_path, args.archive_path)
+
+
+if __name__ == '__main__':
+    sys.argv[0] = 'hat-gui-view-pack'
+    sys.exit(main())
@@ -1,10 +1,13 @@
 import base64
 import itertools
 
+import pytest
+
 from hat import aio
 from hat import json
 import hat.event.common
 
+import hat.gui.adapters.latest
 from hat.gui.adapters.latest import info
 
 
@@ -204,3 +207,372 @@ async def test_event_payload():
     await session.async_close()
     await adapter.async_close()
     await eventer_client.async_close()
+
+
+async def test_changes():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a']},
+                      {'key': 'b',
+                       'event_type': ['b']}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    state = json.Storage()
+    session = await adapter.create_session('user1', {'users'}, state,
+                                           notify_cb)
+
+    changes = []
+    state.register_change_cb(changes.append)
+
+    event = create_json_event(('a',), 2)
+    await adapter.process_events([create_json_event(('a',), 1),
+                                  event,
+                                  create_json_event(('c',), 3)])
+    assert len(changes) == 1
+    assert state.data.keys() == {'a'}
+    assert state.data['a']['payload']['data'] == 2
+
+    b_data = state.data.get('b')
+    await adapter.process_events([create_json_event(('b',), 4)])
+    assert len(changes) == 2
+    assert state.data['a'] is changes[0]['a']
+    assert state.data['b'] is not b_data
+
+    await adapter.process_events([event._replace(id=next(next_event_ids))])
+    assert len(changes) == 2
+
+    await adapter.process_events([create_json_event(('c',), 5)])
+    assert len(changes) == 2
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_item_authorized_roles():
+    conf = {'authorized_roles': ['users', 'admins'],
+            'items': [{'key': 'a',
+                       'event_type': ['a']},
+                      {'key': 'b',
+                       'event_type': ['b'],
+                       'authorized_roles': ['admins']}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    user_state1 = json.Storage()
+    user_session1 = await adapter.create_session('user1', {'users'},
+                                                 user_state1, notify_cb)
+
+    user_state2 = json.Storage()
+    user_session2 = await adapter.create_session('user2', {'users'},
+                                                 user_state2, notify_cb)
+
+    admin_state = json.Storage()
+    admin_session = await adapter.create_session('admin', {'admins'},
+                                                 admin_state, notify_cb)
+
+    await adapter.process_events([create_json_event(('a',), 1),
+                                  create_json_event(('b',), 2)])
+
+    assert user_state1.data.keys() == {'a'}
+    assert user_state1.data is user_state2.data
+    assert admin_state.data.keys() == {'a', 'b'}
+    assert admin_state.data['a'] is user_state1.data['a']
+
+    user_data = user_state1.data
+    await adapter.process_events([create_json_event(('b',), 3)])
+    assert user_state1.data is user_data
+    assert admin_state.data['b']['payload']['data'] == 3
+
+    await user_session1.async_close()
+    await user_session2.async_close()
+
+    user_state3 = json.Storage()
+    user_session3 = await adapter.create_session('user3', {'users'},
+                                                 user_state3, notify_cb)
+    assert user_state3.data.keys() == {'a'}
+
+    await user_session3.async_close()
+    await admin_session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_min_interval():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'min_interval': 0.05},
+                      {'key': 'b',
+                       'event_type': ['b']}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    state = json.Storage()
+    session = await adapter.create_session('user1', {'users'}, state,
+                                           notify_cb)
+
+    changes_queue = aio.Queue()
+    state.register_change_cb(changes_queue.put_nowait)
+
+    await adapter.process_events([create_json_event(('a',), 1)])
+    data = changes_queue.get_nowait()
+    assert data['a']['payload']['data'] == 1
+
+    await adapter.process_events([create_json_event(('a',), 2)])
+    await adapter.process_events([create_json_event(('a',), 3)])
+    await adapter.process_events([create_json_event(('b',), 4)])
+    data = changes_queue.get_nowait()
+    assert data['a']['payload']['data'] == 1
+    assert data['b']['payload']['data'] == 4
+    assert changes_queue.empty()
+
+    data = await aio.wait_for(changes_queue.get(), 0.5)
+    assert data['a']['payload']['data'] == 3
+    assert changes_queue.empty()
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_wildcard_event_type():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a', '?', 'x']},
+                      {'key': 'b',
+                       'event_type': ['b', '*']},
+                      {'key': 'c',
+                       'event_type': ['a', '1', 'x']}]}
+
+    subscription = await aio.call(info.create_subscription, conf)
+    assert subscription.matches(('a', '1', 'x'))
+    assert subscription.matches(('b', '1', '2'))
+    assert not subscription.matches(('a', '1', 'y'))
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    state = json.Storage()
+    session = await adapter.create_session('user1', {'users'}, state,
+                                           notify_cb)
+
+    await adapter.process_events([create_json_event(('a', '1', 'x'), 1),
+                                  create_json_event(('a', '2', 'x'), 2),
+                                  create_json_event(('b',), 3),
+                                  create_json_event(('b', '1', '2'), 4)])
+
+    assert state.data.keys() == {'a/1', 'a/2', 'b', 'b/1/2', 'c'}
+    assert state.data['a/1']['payload']['data'] == 1
+    assert state.data['a/2']['payload']['data'] == 2
+    assert state.data['b']['payload']['data'] == 3
+    assert state.data['b/1/2']['payload']['data'] == 4
+    assert state.data['c']['payload']['data'] == 1
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_lazy_event_conversion(monkeypatch):
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'min_interval': 0.05},
+                      {'key': 'b',
+                       'event_type': ['a'],
+                       'min_interval': 0.05}]}
+
+    converted_events = []
+    event_to_data = hat.gui.adapters.latest._event_to_data
+
+    def on_event_to_data(event):
+        converted_events.append(event)
+        return event_to_data(event)
+
+    monkeypatch.setattr(hat.gui.adapters.latest, '_event_to_data',
+                        on_event_to_data)
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    state = json.Storage()
+    session = await adapter.create_session('user1', {'users'}, state,
+                                           notify_cb)
+
+    changes_queue = aio.Queue()
+    state.register_change_cb(changes_queue.put_nowait)
+
+    event1 = create_binary_event(('a',), 'x', b'1')
+    event2 = create_binary_event(('a',), 'x', b'2')
+    event3 = create_binary_event(('a',), 'x', b'3')
+
+    await adapter.process_events([event1])
+    assert converted_events == [event1]
+
+    await adapter.process_events([event2])
+    await adapter.process_events([event3])
+    assert converted_events == [event1]
+
+    changes_queue.get_nowait_until_empty()
+    data = await aio.wait_for(changes_queue.get(), 0.5)
+    assert data['a'] is data['b']
+    assert data['a']['payload']['data'] == base64.b64encode(b'3').decode()
+    assert converted_events == [event1, event3]
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_client_subscriptions():
+    conf = {'authorized_roles': ['users'],
+            'client_subscriptions': True,
+            'items': [{'key': 'a',
+                       'event_type': ['a']},
+                      {'key': 'b',
+                       'event_type': ['b', '*']}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    state = json.Storage()
+    session = await adapter.create_session('user1', {'users'}, state,
+                                           notify_cb)
+
+    await adapter.process_events([create_json_event(('a',), 1),
+                                  create_json_event(('b', '1'), 2),
+                                  create_json_event(('b', '2'), 3)])
+    assert state.data == {}
+
+    await session.process_request('subscribe', {'keys': ['a']})
+    assert state.data.keys() == {'a'}
+
+    await session.process_request('subscribe', {'prefixes': ['b/']})
+    assert state.data.keys() == {'a', 'b/1', 'b/2'}
+
+    await session.process_request('unsubscribe', {'keys': ['a']})
+    assert state.data.keys() == {'b/1', 'b/2'}
+
+    await adapter.process_events([create_json_event(('a',), 4),
+                                  create_json_event(('b', '3'), 5)])
+    assert state.data.keys() == {'b/1', 'b/2', 'b/3'}
+    assert state.data['b/3']['payload']['data'] == 5
+
+    await session.process_request('unsubscribe', {'prefixes': ['b/']})
+    assert state.data == {}
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_delta_resync():
+    conf = {'authorized_roles': ['users'],
+            'delta_resync': True,
+            'items': [{'key': 'a',
+                       'event_type': ['a', '?']},
+                      {'key': 'b',
+                       'event_type': ['b'],
+                       'authorized_roles': ['admins']}]}
+
+    event_a1 = create_json_event(('a', '1'), 1)
+    event_a2 = create_json_event(('a', '2'), 2)
+    event_b = create_json_event(('b',), 3)
+    queries = []
+
+    def on_query(params):
+        queries.append(params)
+
+        if isinstance(params, hat.event.common.QueryLatestParams):
+            return hat.event.common.QueryResult([event_a1, event_b], False)
+
+        assert params.t_from == event_b.timestamp
+        assert params.order == hat.event.common.Order.ASCENDING
+        return hat.event.common.QueryResult([event_b, event_a2], False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+    await adapter.async_close()
+
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    assert len(queries) == 2
+    assert isinstance(queries[1], hat.event.common.QueryTimeseriesParams)
+
+    def notify_cb(name, data):
+        raise NotImplementedError()
+
+    state = json.Storage()
+    session = await adapter.create_session('user1', {'users'}, state,
+                                           notify_cb)
+    assert state.data.keys() == {'a/1', 'a/2'}
+    assert state.data['a/2']['payload']['data'] == 2
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_delta_resync_query_error():
+    conf = {'authorized_roles': ['users'],
+            'delta_resync': True,
+            'items': [{'key': 'a',
+                       'event_type': ['a']}]}
+
+    event = create_json_event(('a', ), 1)
+    queries = []
+    query_error = False
+
+    def on_query(params):
+        queries.append(params)
+
+        if isinstance(params, hat.event.common.QueryLatestParams):
+            return hat.event.common.QueryResult([event], False)
+
+        if query_error:
+            raise ConnectionError()
+
+        return hat.event.common.QueryResult([event], False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+    await adapter.async_close()
+
+    query_error = True
+    with pytest.raises(ConnectionError):
+        await aio.call(info.create_adapter, conf, eventer_client)
+
+    query_error = False
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    assert len(queries) == 3
+    assert isinstance(queries[1], hat.event.common.QueryTimeseriesParams)
+    assert isinstance(queries[2], hat.event.common.QueryTimeseriesParams)
+
+    await adapter.async_close()
+    await eventer_client.async_close()
@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+
+import pytest
+
+from hat import aio
+from hat import json
+import hat.event.common
+
+from hat.gui.adapters.query import info
+
+
+next_event_ids = (hat.event.common.EventId(1, 1, instance)
+                  for instance in itertools.count(1))
+
+
+class EventerClient(aio.Resource):
+
+    def __init__(self, query_cb=None):
+        self._query_cb = query_cb
+        self._async_group = aio.Group()
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    @property
+    def status(self):
+        raise NotImplementedError()
+
+    async def register(self, events, with_response=False):
+        raise NotImplementedError()
+
+    async def query(self, params):
+        if not self._query_cb:
+            return hat.event.common.QueryResult([], False)
+
+        return await aio.call(self._query_cb, params)
+
+
+def create_event(event_type, payload_data):
+    return hat.event.common.Event(
+        id=next(next_event_ids),
+        type=event_type,
+        timestamp=hat.event.common.now(),
+        source_timestamp=None,
+        payload=hat.event.common.EventPayloadJson(payload_data))
+
+
+def notify_cb(name, data):
+    raise NotImplementedError()
+
+
+async def test_create_subscription():
+    conf = {'authorized_roles': [],
+            'event_types': [['a', '*']]}
+    subscription = await aio.call(info.create_subscription, conf)
+    assert subscription.matches(('a', 'b'))
+    assert not subscription.matches(('b',))
+
+
+async def test_query():
+    events = [create_event(('a', str(i)), i) for i in range(5)]
+    params_queue = aio.Queue()
+
+    conf = {'authorized_roles': ['users'],
+            'event_types': [['a', '*']],
+            'max_results': 2}
+
+    def on_query(params):
+        params_queue.put_nowait(params)
+        start = (next(i for i, event in enumerate(events)
+                      if event.id == params.last_event_id) + 1
+                 if params.last_event_id else 0)
+        return hat.event.common.QueryResult(
+            events[start:start + params.max_results],
+            start + params.max_results < len(events))
+
+    eventer_client = EventerClient(query_cb=on_query)
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    result = await session.process_request('query', {'event_types': [['*']],
+                                                     'max_results': 10})
+    params = params_queue.get_nowait()
+    assert list(params.event_types) == [('a', '*')]
+    assert params.max_results == 2
+    assert [i['payload']['data'] for i in result['events']] == [0, 1]
+    assert result['cursor'] is not None
+
+    result = await session.process_request('query', {
+        'cursor': result['cursor']})
+    assert [i['payload']['data'] for i in result['events']] == [2, 3]
+
+    result = await session.process_request('query', {
+        'cursor': result['cursor']})
+    assert [i['payload']['data'] for i in result['events']] == [4]
+    assert result['cursor'] is None
+
+    result = await session.process_request('query', {
+        'event_types': [['b']]})
+    assert result == {'events': [], 'cursor': None}
+
+    assert params_queue.qsize() == 2
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_cache():
+    query_count = 0
+    query_future = asyncio.Future()
+
+    conf = {'authorized_roles': ['users'],
+            'event_types': [['a', '*'], ['b']]}
+
+    async def on_query(params):
+        nonlocal query_count
+        query_count += 1
+        await query_future
+        return hat.event.common.QueryResult([], False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session1 = await adapter.create_session('user1', {'users'}, state,
+                                            notify_cb)
+    session2 = await adapter.create_session('user2', {'users'}, state,
+                                            notify_cb)
+
+    data = {'event_types': [['a', '*']]}
+    results = asyncio.gather(session1.process_request('query', data),
+                             session2.process_request('query', data))
+    await asyncio.sleep(0.01)
+    query_future.set_result(None)
+    await results
+    assert query_count == 1
+
+    await session1.process_request('query', data)
+    assert query_count == 1
+
+    await adapter.process_events([create_event(('b',), None)])
+    await session2.process_request('query', data)
+    assert query_count == 1
+
+    await adapter.process_events([create_event(('a', 'x'), None)])
+    await session2.process_request('query', data)
+    assert query_count == 2
+
+    await session1.async_close()
+    await session2.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_unauthorized():
+    conf = {'authorized_roles': ['users'],
+            'event_types': [['a']]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'other'}, state,
+                                           notify_cb)
+
+    with pytest.raises(Exception):
+        await session.process_request('query', {})
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
@@ -0,0 +1,293 @@
+import itertools
+
+import pytest
+
+from hat import aio
+from hat import json
+import hat.event.common
+
+from hat.gui.adapters.trend import info
+
+
+next_event_ids = (hat.event.common.EventId(1, 1, instance)
+                  for instance in itertools.count(1))
+
+
+class EventerClient(aio.Resource):
+
+    def __init__(self, query_cb=None):
+        self._query_cb = query_cb
+        self._async_group = aio.Group()
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    @property
+    def status(self):
+        raise NotImplementedError()
+
+    async def register(self, events, with_response=False):
+        raise NotImplementedError()
+
+    async def query(self, params):
+        if not self._query_cb:
+            return hat.event.common.QueryResult([], False)
+
+        return await aio.call(self._query_cb, params)
+
+
+def create_event(event_type, payload_data, t):
+    return hat.event.common.Event(
+        id=next(next_event_ids),
+        type=event_type,
+        timestamp=hat.event.common.timestamp_from_float(t),
+        source_timestamp=None,
+        payload=hat.event.common.EventPayloadJson(payload_data))
+
+
+def notify_cb(name, data):
+    raise NotImplementedError()
+
+
+async def test_create_subscription():
+    conf = {'authorized_roles': [],
+            'items': [{'key': str(i),
+                       'event_type': ('a', str(i)),
+                       'size': 10}
+                      for i in range(10)]}
+    subscription = await aio.call(info.create_subscription, conf)
+    for i in range(10):
+        assert subscription.matches(('a', str(i)))
+        assert not subscription.matches(('b', str(i)))
+
+
+async def test_query():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'size': 3}]}
+
+    def on_query(params):
+        assert isinstance(params, hat.event.common.QueryTimeseriesParams)
+        assert list(params.event_types) == [('a',)]
+        assert params.max_results == 3
+
+        return hat.event.common.QueryResult(
+            [create_event(('a',), i, i) for i in reversed(range(3))],
+            False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    assert state.data == {'a': {'count': 3, 't_from': 0, 't_to': 2}}
+
+    result = await session.process_request('get', {'key': 'a',
+                                                   'width': 10})
+    assert result == {'timestamps': [0, 1, 2],
+                      'values': [0, 1, 2]}
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_ring_buffer():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'size': 5,
+                       'value_path': ['x']}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    assert state.data == {'a': {'count': 0, 't_from': None, 't_to': None}}
+
+    await adapter.process_events([create_event(('a',), {'x': i}, i)
+                                  for i in range(8)])
+    await adapter.process_events([create_event(('a',), {'x': 'abc'}, 8),
+                                  create_event(('a',), {'x': 100}, 1)])
+
+    assert state.data == {'a': {'count': 5, 't_from': 3, 't_to': 7}}
+
+    result = await session.process_request('get', {'key': 'a',
+                                                   'width': 10})
+    assert result == {'timestamps': [3, 4, 5, 6, 7],
+                      'values': [3, 4, 5, 6, 7]}
+
+    result = await session.process_request('get', {'key': 'a',
+                                                   't_from': 4,
+                                                   't_to': 6,
+                                                   'width': 10})
+    assert result == {'timestamps': [4, 5, 6],
+                      'values': [4, 5, 6]}
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_downsampling():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'size': 1000}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    await adapter.process_events([create_event(('a',), (i % 10) - i, i)
+                                  for i in range(1100)])
+
+    result = await session.process_request('get', {'key': 'a',
+                                                   'width': 10})
+
+    assert len(result['values']) == 20
+    assert result['timestamps'] == sorted(result['timestamps'])
+    assert min(result['values']) == 9 - 1099
+    assert max(result['values']) == 0 - 100
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_unauthorized():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'size': 10}]}
+
+    eventer_client = EventerClient()
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'other'}, state,
+                                           notify_cb)
+
+    assert state.data == {}
+
+    with pytest.raises(Exception):
+        await session.process_request('get', {'key': 'a',
+                                              'width': 10})
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_wildcard_event_type():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a', '*'],
+                       'size': 10}]}
+
+    def on_query(params):
+        assert list(params.event_types) == [('a', '*')]
+        return hat.event.common.QueryResult(
+            [create_event(('a', '1'), 1, 1)], False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    assert state.data == {'a': {'count': 1, 't_from': 1, 't_to': 1}}
+
+    await adapter.process_events([create_event(('a', '2'), 2, 2),
+                                  create_event(('a', '3', '4'), 3, 3),
+                                  create_event(('b', '1'), 4, 4)])
+
+    assert state.data == {'a': {'count': 3, 't_from': 1, 't_to': 3}}
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_query_paging():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'size': 10}]}
+
+    events = [create_event(('a',), i, i) for i in reversed(range(20))]
+    page_size = 4
+
+    def on_query(params):
+        assert params.order == hat.event.common.Order.DESCENDING
+
+        start = 0
+        if params.last_event_id is not None:
+            start = next(i for i, event in enumerate(events)
+                         if event.id == params.last_event_id) + 1
+
+        max_results = min(params.max_results, page_size)
+        return hat.event.common.QueryResult(
+            events[start:start + max_results],
+            start + max_results < len(events))
+
+    eventer_client = EventerClient(query_cb=on_query)
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    assert state.data == {'a': {'count': 10, 't_from': 10, 't_to': 19}}
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
+
+
+async def test_duplicate_events():
+    conf = {'authorized_roles': ['users'],
+            'items': [{'key': 'a',
+                       'event_type': ['a'],
+                       'size': 10}]}
+
+    event1 = create_event(('a',), 1, 1)
+    event2 = create_event(('a',), 2, 1)
+
+    def on_query(params):
+        return hat.event.common.QueryResult([event1], False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+    adapter = await aio.call(info.create_adapter, conf, eventer_client)
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'users'}, state,
+                                           notify_cb)
+
+    await adapter.process_events([event1, event2, event1])
+
+    assert state.data == {'a': {'count': 2, 't_from': 1, 't_to': 1}}
+
+    result = await session.process_request('get', {'key': 'a',
+                                                   'width': 10})
+    assert result == {'timestamps': [1, 1],
+                      'values': [1, 2]}
+
+    with pytest.raises(Exception):
+        await session.process_request('get', {'key': 'a',
+                                              'width': 0})
+
+    await session.async_close()
+    await adapter.async_close()
+    await eventer_client.async_close()
@@ -25,6 +25,7 @@ def create_adapter_module():
 
     def create_adapter_module(adapter_cb=None,
                               process_events_cb=None,
+                              resync_cb=None,
                               subscription=subscription):
         module_name = f'test_adapter_{len(module_names)}'
         module_names.append(module_name)
@@ -42,6 +43,10 @@ def create_adapter_module():
                 if process_events_cb:
                     await aio.call(process_events_cb, events)
 
+            async def resync(self):
+                if resync_cb:
+                    await aio.call(resync_cb)
+
             async def create_session(self, user, roles, state, notify_cb):
                 raise NotImplementedError()
 
@@ -138,6 +143,83 @@ async def test_create_adapters(adapter_count, create_adapter_module):
         assert adapter.is_closed
 
 
+@pytest.mark.parametrize("parallelism", [None, 1, 2])
+async def test_create_adapters_parallelism(parallelism,
+                                           create_adapter_module):
+    adapter_count = 5
+    created_queue = aio.Queue()
+    create_futures = collections.deque()
+
+    async def on_create(adapter):
+        future = asyncio.Future()
+        create_futures.append(future)
+        created_queue.put_nowait(adapter)
+        await future
+
+    modules = [create_adapter_module(adapter_cb=on_create)
+               for i in range(adapter_count)]
+
+    confs = [{'name': f'name {i}',
+              'module': module}
+             for i, module in enumerate(modules)]
+
+    infos = collections.deque()
+    for conf in confs:
+        info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+        infos.append(info)
+
+    manager_task = asyncio.create_task(
+        hat.gui.server.adapter.create_manager(infos, None, parallelism))
+
+    for i in range(adapter_count):
+        await created_queue.get()
+        await asyncio.sleep(0.01)
+
+        active_count = sum(1 for future in create_futures
+                           if not future.done())
+        if parallelism:
+            assert active_count == min(parallelism, adapter_count - i)
+            create_futures[-active_count].set_result(None)
+
+        elif i == 0:
+            assert active_count == adapter_count
+            for future in create_futures:
+                future.set_result(None)
+            break
+
+    manager = await manager_task
+
+    assert list(manager.adapters.keys()) == [conf['name'] for conf in confs]
+
+    await manager.async_close()
+
+
+async def test_create_adapters_error(create_adapter_module):
+    adapters_queue = aio.Queue()
+
+    def on_create(adapter):
+        adapters_queue.put_nowait(adapter)
+
+    def on_create_error(adapter):
+        raise Exception()
+
+    confs = [{'name': 'name 1',
+              'module': create_adapter_module(adapter_cb=on_create)},
+             {'name': 'name 2',
+              'module': create_adapter_module(adapter_cb=on_create_error)}]
+
+    infos = collections.deque()
+    for conf in confs:
+        info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+        infos.append(info)
+
+    with pytest.raises(Exception):
+        await hat.gui.server.adapter.create_manager(infos, None)
+
+    adapter = await adapters_queue.get()
+    assert adapter.is_closed
+
+
 async def test_close_adapter(create_adapter_module):
     name = 'name'
     modules = create_adapter_module()
@@ -187,6 +269,171 @@ async def test_adapter_process_events(create_adapter_module):
     await manager.async_close()
 
 
+async def test_adapters_process_events(create_adapter_module):
+    events_queues = {}
+    subscriptions = {'a': [('a', '*')],
+                     'b': [('b', '?')],
+                     'c': [('a', 'x'), ('b', '*')]}
+
+    infos = collections.deque()
+    for name, query_types in subscriptions.items():
+        events_queue = aio.Queue()
+        events_queues[name] = events_queue
+
+        module = create_adapter_module(
+            process_events_cb=events_queue.put_nowait,
+            subscription=hat.event.common.create_subscription(query_types))
+        conf = {'name': name,
+                'module': module}
+        info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+        infos.append(info)
+
+    manager = await hat.gui.server.adapter.create_manager(infos, None)
+
+    event1 = create_event(('a', 'x'))
+    event2 = create_event(('b', 'y'))
+    event3 = create_event(('b',))
+    event4 = create_event(('c',))
+    await manager.process_events([event1, event2, event3, event4])
+
+    assert list(await events_queues['a'].get()) == [event1]
+    assert list(await events_queues['b'].get()) == [event2]
+    assert list(await events_queues['c'].get()) == [event1, event2, event3]
+    assert all(i.empty() for i in events_queues.values())
+
+    await manager.async_close()
+
+
+async def test_event_batching(create_adapter_module):
+    events_queue = aio.Queue()
+    name = 'name'
+
+    module = create_adapter_module(process_events_cb=events_queue.put_nowait)
+
+    conf = {'name': name,
+            'module': module}
+
+    info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+    manager = await hat.gui.server.adapter.create_manager(
+        [info], None,
+        batch_delay=0.05,
+        batch_size=3,
+        urgent_event_types=[('a', 'urgent')])
+
+    event1 = create_event(('a', '1'))
+    event2 = create_event(('a', '2'))
+    await manager.process_events([event1])
+    await manager.process_events([event2])
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(events_queue.get(), 0.01)
+
+    result = await asyncio.wait_for(events_queue.get(), 0.1)
+    assert list(result) == [event1, event2]
+
+    events = [create_event(('a', str(i))) for i in range(3)]
+    await manager.process_events(events[:1])
+    await manager.process_events(events[1:])
+    result = await asyncio.wait_for(events_queue.get(), 0.01)
+    assert list(result) == events
+
+    event3 = create_event(('a', '3'))
+    event4 = create_event(('a', 'urgent'))
+    await manager.process_events([event3])
+    await manager.process_events([event4])
+    result = await asyncio.wait_for(events_queue.get(), 0.01)
+    assert list(result) == [event3, event4]
+
+    await asyncio.sleep(0.1)
+    assert events_queue.empty()
+
+    await manager.async_close()
+
+
+@pytest.mark.parametrize('overflow', ['BLOCK', 'COALESCE', 'DROP'])
+async def test_adapter_queue_overflow(overflow, create_adapter_module):
+    events_queue = aio.Queue()
+    resync_queue = aio.Queue()
+    process_future = asyncio.Future()
+    name = 'name'
+
+    async def on_process_events(events):
+        events_queue.put_nowait(events)
+        await process_future
+
+    module = create_adapter_module(process_events_cb=on_process_events,
+                                   resync_cb=lambda: resync_queue.put_nowait(
+                                       None))
+
+    conf = {'name': name,
+            'module': module,
+            'queue_size': 1,
+            'queue_overflow': overflow}
+
+    info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+    manager = await hat.gui.server.adapter.create_manager([info], None)
+
+    event1 = create_event(('a', '1'))
+    event2 = create_event(('a', '2'))
+    event3 = create_event(('a', '3'))
+    event4 = create_event(('a', '4'))
+
+    await manager.process_events([event1])
+    assert list(await events_queue.get()) == [event1]
+
+    await manager.process_events([event2])
+    assert manager.queue_infos[name].size == 1
+
+    process_events_task = asyncio.create_task(
+        manager.process_events([event3]))
+    await asyncio.sleep(0.01)
+
+    if overflow == 'BLOCK':
+        assert not process_events_task.done()
+
+    else:
+        assert process_events_task.done()
+        await manager.process_events([event4])
+
+    process_future.set_result(None)
+    await process_events_task
+
+    if overflow == 'BLOCK':
+        assert list(await events_queue.get()) == [event2]
+        assert list(await events_queue.get()) == [event3]
+        assert manager.queue_infos[name].dropped == 0
+
+    elif overflow == 'COALESCE':
+        assert list(await events_queue.get()) == [event2, event3, event4]
+        assert manager.queue_infos[name].dropped == 0
+
+    elif overflow == 'DROP':
+        await resync_queue.get()
+        assert manager.queue_infos[name].dropped == 3
+
+    assert events_queue.empty()
+    assert manager.queue_infos[name].size == 0
+
+    await manager.async_close()
+
+
+async def test_adapter_process_events_error(create_adapter_module):
+
+    def on_process_events(events):
+        raise Exception()
+
+    module = create_adapter_module(process_events_cb=on_process_events)
+
+    conf = {'name': 'name',
+            'module': module}
+
+    info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+    manager = await hat.gui.server.adapter.create_manager([info], None)
+
+    await manager.process_events([create_event(('a', 'b'))])
+    await manager.wait_closed()
+
+
 async def test_duplicate_adapter_name(create_adapter_module):
     name = 'name'
 
@@ -0,0 +1,37 @@
+import gzip
+
+import pytest
+
+import hat.gui.server.encoding
+
+
+def test_compress():
+    assert hat.gui.server.encoding.compress(b'') == {}
+    assert hat.gui.server.encoding.compress(b'x' * 10) == {}
+
+    body = b'x' * 1000
+    encodings = hat.gui.server.encoding.compress(body)
+
+    assert set(encodings.keys()) == set(
+        hat.gui.server.encoding.get_encodings())
+    assert gzip.decompress(encodings['gzip']) == body
+
+    body = bytes(range(256)) * 4
+    encodings = hat.gui.server.encoding.compress(body)
+    assert all(len(i) < len(body) for i in encodings.values())
+
+
+@pytest.mark.parametrize('accept_encoding, encodings, result', [
+    ('', {'gzip': b''}, None),
+    ('gzip', {}, None),
+    ('gzip', {'gzip': b''}, 'gzip'),
+    ('gzip, deflate', {'gzip': b''}, 'gzip'),
+    ('GZIP', {'gzip': b''}, 'gzip'),
+    ('gzip;q=0', {'gzip': b''}, None),
+    ('*', {'gzip': b''}, 'gzip'),
+    ('*, gzip;q=0', {'gzip': b''}, None),
+    ('deflate', {'gzip': b''}, None),
+])
+def test_select_encoding(accept_encoding, encodings, result):
+    assert hat.gui.server.encoding.select_encoding(accept_encoding,
+                                                   encodings) == result
@@ -0,0 +1,111 @@
+import asyncio
+import itertools
+
+import pytest
+
+from hat import aio
+from hat import json
+import hat.event.common
+
+import hat.gui.server.adapter
+
+
+next_event_ids = (hat.event.common.EventId(1, 1, instance)
+                  for instance in itertools.count(1))
+
+
+class EventerClient(aio.Resource):
+
+    def __init__(self, query_cb=None):
+        self._query_cb = query_cb
+        self._async_group = aio.Group()
+
+    @property
+    def async_group(self):
+        return self._async_group
+
+    async def register(self, events, with_response=False):
+        raise NotImplementedError()
+
+    async def query(self, params):
+        if not self._query_cb:
+            return hat.event.common.QueryResult([], False)
+
+        return await aio.call(self._query_cb, params)
+
+
+def create_event(event_type, data):
+    return hat.event.common.Event(
+        id=next(next_event_ids),
+        type=event_type,
+        timestamp=hat.event.common.now(),
+        source_timestamp=None,
+        payload=hat.event.common.EventPayloadJson(data))
+
+
+async def wait_state(state, cond):
+    while not cond(state.data):
+        await asyncio.sleep(0.01)
+
+
+async def test_process_adapter():
+    query_queue = aio.Queue()
+    event1 = create_event(('a', '1'), 123)
+
+    def on_query(params):
+        query_queue.put_nowait(params)
+        return hat.event.common.QueryResult([event1], False)
+
+    eventer_client = EventerClient(query_cb=on_query)
+
+    conf = {'name': 'name',
+            'module': 'hat.gui.adapters.latest',
+            'hosting': 'PROCESS',
+            'authorized_roles': ['a'],
+            'items': [{'key': 'x',
+                       'event_type': ['a', '*']}]}
+
+    info = await hat.gui.server.adapter.create_conf_adapter_info(conf)
+    manager = await hat.gui.server.adapter.create_manager([info],
+                                                          eventer_client)
+    adapter = manager.adapters['name']
+
+    params = await query_queue.get()
+    assert params.event_types == [('a', '*')]
+
+    state = json.Storage()
+    session = await adapter.create_session('user', {'a'}, state, None)
+
+    await aio.wait_for(
+        wait_state(state, lambda data: data and 'x/1' in data), 5)
+    assert state.data['x/1']['payload']['data'] == 123
+
+    event2 = create_event(('a', '2'), 321)
+    await manager.process_events([event2])
+
+    await aio.wait_for(
+        wait_state(state, lambda data: 'x/2' in data), 5)
+    assert state.data['x/2']['payload']['data'] == 321
+
+    with pytest.raises(Exception):
+        await session.process_request('subscribe', {'keys': ['x/1']})
+
+    await session.async_close()
+    assert adapter.is_open
+
+    await manager.async_close()
+    assert adapter.is_closed
+    assert adapter._process.returncode is not None
+
+
+async def test_process_adapter_error():
+    conf = {'name': 'name',
+            'module': 'hat.gui.adapters.latest',
+            'hosting': 'PROCESS'}
+
+    info = await hat.gui.server.adapter.create_conf_adapter_info(
+        {**conf, 'items': []})
+
+    with pytest.raises(Exception):
+        await hat.gui.server.adapter.create_manager(
+            [info._replace(conf=conf)], EventerClient())
@@ -1,3 +1,6 @@
+import gzip
+
+import aiohttp
 import pytest
 
 from hat import aio
@@ -8,6 +11,7 @@ import hat.event.common
 from hat.gui import common
 import hat.gui.server.server
 import hat.gui.server.user
+import hat.gui.server.view
 
 
 class AdapterSession(common.AdapterSession):
@@ -89,6 +93,9 @@ class ViewManager:
     def __init__(self, views={}):
         self._views = views
 
+    def get_cached(self, name):
+        return self._views.get(name)
+
     async def get(self, name):
         return self._views[name]
 
@@ -139,6 +146,11 @@ def ws_addr(port):
     return f'ws://127.0.0.1:{port}/ws'
 
 
+@pytest.fixture
+def http_addr(port):
+    return f'http://127.0.0.1:{port}'
+
+
 async def test_empty_server(port, ws_addr):
     user_manager = UserManager()
     view_manager = ViewManager()
@@ -198,6 +210,7 @@ async def test_login(port, ws_addr):
     assert data == {'user': None,
                     'roles': [],
                     'view': None,
+                    'view_digest': None,
                     'conf': None}
 
     with pytest.raises(Exception):
@@ -218,6 +231,7 @@ async def test_login(port, ws_addr):
     assert data == {'user': 'user',
                     'roles': ['a'],
                     'view': None,
+                    'view_digest': None,
                     'conf': None}
 
     await client.send('logout', None)
@@ -227,6 +241,7 @@ async def test_login(port, ws_addr):
     assert data == {'user': None,
                     'roles': [],
                     'view': None,
+                    'view_digest': None,
                     'conf': None}
 
     await client.async_close()
@@ -484,3 +499,251 @@ async def test_clients_event(port, ws_addr):
     await client.async_close()
     await server.async_close()
     await eventer_client.async_close()
+
+
+async def test_ui_files_cache(port, monkeypatch):
+    ui_paths = []
+
+    def get_ui_files(ui_path):
+        ui_paths.append(ui_path)
+        return {}
+
+    monkeypatch.setattr(hat.gui.server.server, '_ui_files_cache', {})
+    monkeypatch.setattr(hat.gui.server.server, '_ext_get_ui_files',
+                        get_ui_files)
+
+    eventer_client = EventerClient()
+
+    for _ in range(2):
+        server = await hat.gui.server.server.create_server(
+            host='127.0.0.1',
+            port=port,
+            name='name',
+            initial_view=None,
+            client_conf=None,
+            user_manager=UserManager(),
+            view_manager=ViewManager(),
+            adapter_manager=AdapterManager(),
+            eventer_client=eventer_client)
+        await server.async_close()
+
+    assert len(ui_paths) == 1
+
+    await eventer_client.async_close()
+
+
+async def test_view_files(port, ws_addr, http_addr):
+    notify_queue = aio.Queue()
+
+    view_files = {
+        'index.js': hat.gui.server.view.ViewFile(
+            type=hat.gui.server.view.ViewFileType.TEXT,
+            digest='abc',
+            body=b'console.log(123);',
+            encodings={}),
+        'a/b.json': hat.gui.server.view.ViewFile(
+            type=hat.gui.server.view.ViewFileType.JSON,
+            digest='cba',
+            body=b'[1, 2, 3]',
+            encodings={}),
+        'c.txt': hat.gui.server.view.ViewFile(
+            type=hat.gui.server.view.ViewFileType.TEXT,
+            digest='xyz',
+            body=b'x' * 1000,
+            encodings={'gzip': gzip.compress(b'x' * 1000)})}
+    view = hat.gui.server.view.View(name='view name',
+                                    conf=None,
+                                    data={},
+                                    digest='xyz',
+                                    files=view_files)
+
+    user_manager = UserManager()
+    view_manager = ViewManager({view.name: view})
+    adapter_manager = AdapterManager()
+    eventer_client = EventerClient()
+
+    server = await hat.gui.server.server.create_server(
+        host='127.0.0.1',
+        port=port,
+        name='name',
+        initial_view=view.name,
+        client_conf=None,
+        user_manager=user_manager,
+        view_manager=view_manager,
+        adapter_manager=adapter_manager,
+        eventer_client=eventer_client,
+        autoflush_delay=0)
+    client = await juggler.connect(
+        ws_addr,
+        lambda client, name, data: notify_queue.put_nowait((name, data)))
+
+    name, data = await notify_queue.get()
+    assert name == 'init'
+    assert data['view_digest'] == view.digest
+    assert data['view'].keys() == view_files.keys()
+    assert data['view']['index.js']['type'] == 'TEXT'
+    assert data['view']['a/b.json']['type'] == 'JSON'
+
+    async with aiohttp.ClientSession() as session:
+        for file_name, view_file in view_files.items():
+            url = http_addr + data['view'][file_name]['url']
+            headers = {'Accept-Encoding': 'gzip'}
+            async with session.get(url, headers=headers) as res:
+                assert res.status == 200
+                assert 'immutable' in res.headers['Cache-Control']
+                assert await res.read() == view_file.body
+
+                if view_file.encodings:
+                    assert res.headers['Content-Encoding'] == 'gzip'
+
+                else:
+                    assert 'Content-Encoding' not in res.headers
+
+            headers = {'If-None-Match': res.headers['ETag']}
+            async with session.get(url, headers=headers) as res:
+                assert res.status == 304
+
+        url = http_addr + data['view']['index.js']['url'].replace('abc',
+                                                                  'cba')
+        async with session.get(url) as res:
+            assert res.status == 404
+
+        async with session.get(http_addr + '/views/xyz/abc/index.js') as res:
+            assert res.status == 404
+
+        async with session.get(http_addr + '/client_conf') as res:
+            assert res.status == 200
+            assert res.headers['Cache-Control'] == 'no-cache'
+
+    await client.async_close()
+    await server.async_close()
+    await eventer_client.async_close()
+
+
+async def test_view_files_not_issued(port, ws_addr, http_addr):
+    notify_queue = aio.Queue()
+    get_queue = aio.Queue()
+
+    view_file = hat.gui.server.view.ViewFile(
+        type=hat.gui.server.view.ViewFileType.TEXT,
+        digest='abc',
+        body=b'console.log(123);',
+        encodings={})
+    views = {name: hat.gui.server.view.View(name=name,
+                                            conf=None,
+                                            data={},
+                                            digest=name,
+                                            files={'index.js': view_file})
+             for name in ['view1', 'view2']}
+
+    class UncachedViewManager(ViewManager):
+
+        def get_cached(self, name):
+            return
+
+        async def get(self, name):
+            get_queue.put_nowait(name)
+            return await super().get(name)
+
+    user_manager = UserManager()
+    view_manager = UncachedViewManager(views)
+    adapter_manager = AdapterManager()
+    eventer_client = EventerClient()
+
+    server = await hat.gui.server.server.create_server(
+        host='127.0.0.1',
+        port=port,
+        name='name',
+        initial_view='view1',
+        client_conf=None,
+        user_manager=user_manager,
+        view_manager=view_manager,
+        adapter_manager=adapter_manager,
+        eventer_client=eventer_client,
+        autoflush_delay=0)
+    client = await juggler.connect(
+        ws_addr,
+        lambda client, name, data: notify_queue.put_nowait((name, data)))
+
+    name, data = await notify_queue.get()
+    assert name == 'init'
+    assert await get_queue.get() == 'view1'
+
+    async with aiohttp.ClientSession() as session:
+        url = http_addr + data['view']['index.js']['url']
+        async with session.get(url) as res:
+            assert res.status == 200
+            assert await res.read() == view_file.body
+
+        assert await get_queue.get() == 'view1'
+
+        url = http_addr + '/views/view2/abc/index.js'
+        async with session.get(url) as res:
+            assert res.status == 404
+
+    assert get_queue.empty()
+
+    await client.async_close()
+    await server.async_close()
+    await eventer_client.async_close()
+
+
+async def test_view_digests(port, ws_addr):
+    notify_queue = aio.Queue()
+
+    view = hat.gui.server.view.View(name='view',
+                                    conf=None,
+                                    data={},
+                                    digest='xyz',
+                                    files={})
+    users = {('user', 'pass'): hat.gui.server.user.User(name='user',
+                                                        roles=set(),
+                                                        view=view.name)}
+
+    user_manager = UserManager(users)
+    view_manager = ViewManager({view.name: view})
+    adapter_manager = AdapterManager()
+    eventer_client = EventerClient()
+
+    server = await hat.gui.server.server.create_server(
+        host='127.0.0.1',
+        port=port,
+        name='name',
+        initial_view=view.name,
+        client_conf=None,
+        user_manager=user_manager,
+        view_manager=view_manager,
+        adapter_manager=adapter_manager,
+        eventer_client=eventer_client,
+        autoflush_delay=0)
+    client = await juggler.connect(
+        ws_addr,
+        lambda client, name, data: notify_queue.put_nowait((name, data)))
+
+    name, data = await notify_queue.get()
+    assert name == 'init'
+    assert data['view'] == {}
+    assert data['view_digest'] == view.digest
+
+    await client.send('view_digests', [view.digest])
+    await client.send('login', {'name': 'user',
+                                'password': 'pass'})
+
+    name, data = await notify_queue.get()
+    assert name == 'init'
+    assert data['user'] == 'user'
+    assert data['view'] is None
+    assert data['view_digest'] == view.digest
+
+    await client.send('view_digests', [])
+    await client.send('logout', None)
+
+    name, data = await notify_queue.get()
+    assert name == 'init'
+    assert data['user'] is None
+    assert data['view'] == {}
+    assert data['view_digest'] == view.digest
+
+    await client.async_close()
+    await server.async_close()
+    await eventer_client.async_close()
@@ -1,4 +1,5 @@
-import base64
+import os
+import time
 
 import pytest
 
@@ -43,7 +44,7 @@ async def test_empty_view_manager():
       'b.svg': ['b1', ['b2', '123']]}),
 
     ({'a.bin': '123'},
-     {'a.bin': base64.b64encode(b'123').decode('utf-8')}),
+     {'a.bin': b'123'}),
 ])
 async def test_view_data(tmp_path, files, data):
     name = 'name'
@@ -74,6 +75,117 @@ async def test_view_data(tmp_path, files, data):
         await manager.get(name)
 
 
+async def test_view_files(tmp_path):
+    name = 'name'
+    view_confs = [{'name': name,
+                   'view_path': str(tmp_path),
+                   'conf': None}]
+    manager = hat.gui.server.view.ViewManager(view_confs)
+
+    (tmp_path / 'a.js').write_text('abc')
+    (tmp_path / 'b.yaml').write_text('x: 1')
+    (tmp_path / 'c.bin').write_bytes(b'\x00\x01')
+
+    view = await manager.get(name)
+
+    assert view.files.keys() == {'a.js', 'b.yaml', 'c.bin'}
+
+    view_file = view.files['a.js']
+    assert view_file.type == hat.gui.server.view.ViewFileType.TEXT
+    assert view_file.body == b'abc'
+
+    view_file = view.files['b.yaml']
+    assert view_file.type == hat.gui.server.view.ViewFileType.JSON
+    assert json.decode(view_file.body.decode('utf-8')) == {'x': 1}
+
+    view_file = view.files['c.bin']
+    assert view_file.type == hat.gui.server.view.ViewFileType.BINARY
+    assert view_file.body == b'\x00\x01'
+    assert view_file.body is view.data['c.bin']
+
+    await manager.async_close()
+
+
+async def test_large_xml(tmp_path):
+    name = 'name'
+    view_confs = [{'name': name,
+                   'view_path': str(tmp_path),
+                   'conf': None}]
+    manager = hat.gui.server.view.ViewManager(view_confs)
+
+    count = 10_000
+    (tmp_path / 'a.svg').write_text(f"<a>{'<b>1</b>' * count}</a>")
+
+    view = await manager.get(name)
+    assert view.data['a.svg'] == ['a', *(['b', '1'] for _ in range(count))]
+
+    await manager.async_close()
+
+
+async def test_parse_cache(tmp_path):
+    name = 'name'
+    view_path = tmp_path / 'view'
+    parse_cache_path = tmp_path / 'cache'
+    view_confs = [{'name': name,
+                   'view_path': str(view_path),
+                   'conf': None}]
+
+    view_path.mkdir()
+    (view_path / 'a.xml').write_text('<a>123</a>')
+
+    manager = hat.gui.server.view.ViewManager(
+        view_confs, parse_cache_path=parse_cache_path)
+    view = await manager.get(name)
+    assert view.data['a.xml'] == ['a', '123']
+    await manager.async_close()
+
+    cache_paths = list(parse_cache_path.rglob('*.json'))
+    assert len(cache_paths) == 1
+    json.encode_file(['a', '321'], cache_paths[0])
+
+    manager = hat.gui.server.view.ViewManager(
+        view_confs, parse_cache_path=parse_cache_path)
+    view = await manager.get(name)
+    assert view.data['a.xml'] == ['a', '321']
+    await manager.async_close()
+
+
+async def test_view_archive(tmp_path):
+    view_path = tmp_path / 'view'
+    archive_path = tmp_path / 'view.archive'
+    view_confs = [{'name': 'dir',
+                   'view_path': str(view_path),
+                   'conf': None},
+                  {'name': 'archive',
+                   'view_archive': str(archive_path),
+                   'conf': None}]
+    manager = hat.gui.server.view.ViewManager(view_confs, stamp_delay=0)
+
+    view_path.mkdir()
+    (view_path / 'a.js').write_text('abc' * 1000)
+    (view_path / 'b.yaml').write_text('x: 1')
+    (view_path / 'c.bin').write_bytes(b'\x00\x01')
+    (view_path / 'd.svg').write_text('<a>123</a>')
+
+    hat.gui.server.view.create_archive(view_path, archive_path)
+
+    dir_view = await manager.get('dir')
+    archive_view = await manager.get('archive')
+
+    assert archive_view.digest == dir_view.digest
+    assert archive_view.data == dir_view.data
+    assert archive_view.files == dir_view.files
+    assert archive_view.files['a.js'].encodings
+
+    (view_path / 'a.js').write_text('cba')
+    hat.gui.server.view.create_archive(view_path, archive_path)
+
+    archive_view = await manager.get('archive')
+    assert archive_view.data['a.js'] == 'cba'
+
+    await manager.async_close()
+
+
 async def test_invalid_view_path():
     name = 'name'
     view_confs = [{'name': name,
@@ -125,6 +237,155 @@ async def test_validate_conf(tmp_path):
     await manager.async_close()
 
 
+async def test_view_cache(tmp_path):
+    name = 'name'
+    file_path = tmp_path / 'a.json'
+    view_confs = [{'name': name,
+                   'view_path': str(tmp_path),
+                   'conf': None}]
+    manager = hat.gui.server.view.ViewManager(view_confs)
+
+    def write_file(data, mtime):
+        json.encode_file(data, file_path)
+        os.utime(file_path, (mtime, mtime))
+
+    write_file(1, time.time() - 100)
+
+    view1 = await manager.get(name)
+    view2 = await manager.get(name)
+    assert view1.data == {'a.json': 1}
+    assert view1 is view2
+
+    write_file(1, time.time() - 50)
+
+    view3 = await manager.get(name)
+    assert view3.data == {'a.json': 1}
+    assert view3.data is view1.data
+    assert view3.digest == view1.digest
+
+    write_file(2, time.time() - 10)
+
+    view4 = await manager.get(name)
+    assert view4.data == {'a.json': 2}
+    assert view4.digest != view1.digest
+
+    write_file(3, time.time())
+
+    view5 = await manager.get(name)
+    view6 = await manager.get(name)
+    assert view5.data == {'a.json': 3}
+    assert view5 is not view6
+    assert view5.data is view6.data
+
+    await manager.async_close()
+
+
+async def test_validator_cache(tmp_path, monkeypatch):
+    name = 'name'
+    conf_path = tmp_path / 'conf.json'
+    schema_path = tmp_path / 'schema.json'
+    view_confs = [{'name': name,
+                   'view_path': str(tmp_path),
+                   'conf_path': str(conf_path)}]
+    manager = hat.gui.server.view.ViewManager(view_confs)
+
+    validators = []
+    validations = []
+
+    class Validator(json.DefaultSchemaValidator):
+
+        def __init__(self, repo):
+            super().__init__(repo)
+            validators.append(self)
+
+        def validate(self, schema_id, data):
+            super().validate(schema_id, data)
+            validations.append(data)
+
+    monkeypatch.setattr(json, 'DefaultSchemaValidator', Validator)
+
+    schema = {'id': 'test://schema',
+              'type': 'object',
+              'required': ['abc']}
+    json.encode_file(schema, schema_path)
+    json.encode_file({'abc': 1}, conf_path)
+
+    for _ in range(3):
+        view = await manager.get(name)
+        assert view.conf == {'abc': 1}
+
+    assert len(validators) == 1
+    assert validations == [{'abc': 1}]
+
+    json.encode_file({'abc': 2}, conf_path)
+
+    view = await manager.get(name)
+    assert view.conf == {'abc': 2}
+
+    assert len(validators) == 1
+    assert validations == [{'abc': 1}, {'abc': 2}]
+
+    schema = {'id': 'test://schema',
+              'type': 'object',
+              'required': ['cba']}
+    json.encode_file(schema, schema_path)
+
+    with pytest.raises(Exception):
+        await manager.get(name)
+
+    assert len(validators) == 2
+
+    await manager.async_close()
+
+
+async def test_cache_size(tmp_path):
+    view_confs = []
+    for name in ['a', 'b']:
+        view_path = tmp_path / name
+        view_path.mkdir()
+        file_path = view_path / 'data.bin'
+        file_path.write_bytes(b'x' * 1000)
+        mtime = time.time() - 100
+        os.utime(file_path, (mtime, mtime))
+
+        view_confs.append({'name': name,
+                           'view_path': str(view_path),
+                           'conf': None})
+
+    manager = hat.gui.server.view.ViewManager(view_confs, cache_size=1500)
+
+    info = manager.cache_info
+    assert info == (0, 0, 0, 0, 1500)
+
+    await manager.get('a')
+    await manager.get('a')
+
+    info = manager.cache_info
+    assert info.hits == 1
+    assert info.misses == 1
+    assert info.evictions == 0
+    assert 1000 <= info.size <= 1500
+
+    await manager.get('b')
+
+    info = manager.cache_info
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.evictions == 1
+    assert manager.get_cached('a') is None
+    assert manager.get_cached('b') is not None
+
+    await manager.get('a')
+
+    info = manager.cache_info
+    assert info.misses == 3
+    assert info.evictions == 2
+    assert manager.get_cached('a') is not None
+    assert manager.get_cached('b') is None
+
+    await manager.async_close()
+
+
 async def test_builtin_view():
     name = 'name'
     view_confs = [{'name': name,